@@ -0,0 +1,111 @@
+import bisect
+import os
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# One fixed-size row per chunk; the row number is the chunk id
+CHUNK_DTYPE = np.dtype(
+    [("doc_id", np.int32), ("page", np.int32), ("start", np.int64), ("end", np.int64)]
+)
+
+
+class Chunk:
+    """
+    A chunk as seen by callers: its integer id, source document and 1-based
+    page (0 when unknown), and its [start, end) span in the shared text.
+    """
+
+    __slots__ = ("id", "doc_id", "page", "start", "end", "text")
+
+    def __init__(self, id: int, doc_id: int, page: int, start: int, end: int, text: str):
+        self.id = id
+        self.doc_id = doc_id
+        self.page = page
+        self.start = start
+        self.end = end
+        self.text = text
+
+    def __repr__(self) -> str:
+        return (
+            f"Chunk(id={self.id}, doc_id={self.doc_id}, page={self.page}, "
+            f"start={self.start}, end={self.end})"
+        )
+
+
+class ChunkTable:
+    """
+    Chunks of one or more documents stored compactly.
+
+    The documents' text is kept once, concatenated into a shared buffer, and
+    each chunk is a (doc_id, page, start, end) row of a NumPy structured array
+    whose offsets index that buffer. Overlapping chunks cost no extra text,
+    identical chunks keep distinct ids, and the page survives for citations.
+    Chunk texts are sliced out of the buffer on access.
+    """
+
+    def __init__(self, text: str = "", records: Optional[np.ndarray] = None):
+        self.text = text
+        self.records = records if records is not None else np.empty(0, dtype=CHUNK_DTYPE)
+
+    @classmethod
+    def from_spans(
+        cls,
+        documents: Sequence[str],
+        spans: Sequence[Sequence[Tuple[int, int]]],
+        page_starts: Optional[Sequence[Sequence[int]]] = None,
+    ) -> "ChunkTable":
+        """
+        Builds a table from per-document (start, end) spans. page_starts, if given,
+        holds each document's page start offsets; a chunk's page is the one its start falls in.
+        """
+        records = np.empty(sum(len(doc_spans) for doc_spans in spans), dtype=CHUNK_DTYPE)
+        row, offset = 0, 0
+        for doc_id, (document, doc_spans) in enumerate(zip(documents, spans)):
+            starts = page_starts[doc_id] if page_starts is not None else None
+            for start, end in doc_spans:
+                page = bisect.bisect_right(starts, start) if starts else 0
+                records[row] = (doc_id, page, offset + start, offset + end)
+                row += 1
+            offset += len(document)
+        return cls("".join(documents), records)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, chunk_id: int) -> Chunk:
+        doc_id, page, start, end = self.records[chunk_id].tolist()
+        return Chunk(int(chunk_id), doc_id, page, start, end, self.text[start:end])
+
+    def __iter__(self) -> Iterator[Chunk]:
+        for chunk_id in range(len(self)):
+            yield self[chunk_id]
+
+    def get_text(self, chunk_id: int) -> str:
+        record = self.records[chunk_id]
+        return self.text[int(record["start"]) : int(record["end"])]
+
+    def texts(self) -> List[str]:
+        return [
+            self.text[start:end]
+            for start, end in zip(self.records["start"].tolist(), self.records["end"].tolist())
+        ]
+
+    def total_length(self) -> int:
+        return int((self.records["end"] - self.records["start"]).sum())
+
+    def save(self, path: str) -> None:
+        """Writes chunks.npy (the records) and chunks.txt (the shared text) into directory path."""
+        np.save(os.path.join(path, "chunks.npy"), self.records)
+        with open(os.path.join(path, "chunks.txt"), "w", encoding="utf-8", newline="") as f:
+            f.write(self.text)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> Optional["ChunkTable"]:
+        """Loads a table written by save(), or returns None if path has none."""
+        records_path = os.path.join(path, "chunks.npy")
+        if not os.path.exists(records_path):
+            return None
+        with open(os.path.join(path, "chunks.txt"), "r", encoding="utf-8", newline="") as f:
+            text = f.read()
+        return cls(text, np.load(records_path, mmap_mode="r" if mmap else None))
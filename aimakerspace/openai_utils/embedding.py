@@ -1,13 +1,32 @@
 from dotenv import load_dotenv
 from openai import AsyncOpenAI, OpenAI
 import openai
-from typing import List
+from typing import Callable, List, Optional
 import os
 import asyncio
+import random
+import time
+
+import tiktoken
+
+# Errors worth retrying: the provider is throttling us or the connection dropped.
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+)
 
 
 class EmbeddingModel:
-    def __init__(self, embeddings_model_name: str = "text-embedding-3-small"):
+    def __init__(
+        self,
+        embeddings_model_name: str = "text-embedding-3-small",
+        max_batch_tokens: int = 100_000,
+        max_batch_size: int = 512,
+        max_concurrency: int = 4,
+        max_retries: int = 5,
+        initial_backoff: float = 1.0,
+    ):
         load_dotenv()
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.async_client = AsyncOpenAI()
@@ -20,33 +39,112 @@ class EmbeddingModel:
         openai.api_key = self.openai_api_key
         self.embeddings_model_name = embeddings_model_name
 
-    async def async_get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
-        embedding_response = await self.async_client.embeddings.create(
-            input=list_of_text, model=self.embeddings_model_name
-        )
+        # Batching: a request never exceeds max_batch_tokens or max_batch_size inputs,
+        # and at most max_concurrency requests are in flight at once.
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        try:
+            self._encoding = tiktoken.encoding_for_model(embeddings_model_name)
+        except Exception:
+            # Unknown model name or the BPE file can't be fetched; fall back to an estimate
+            self._encoding = None
 
-        return [embeddings.embedding for embeddings in embedding_response.data]
+    def count_tokens(self, text: str) -> int:
+        if self._encoding is None:
+            return len(text) // 4 + 1
+        return len(self._encoding.encode(text, disallowed_special=()))
 
-    async def async_get_embedding(self, text: str) -> List[float]:
-        embedding = await self.async_client.embeddings.create(
-            input=text, model=self.embeddings_model_name
-        )
+    def make_batches(self, list_of_text: List[str]) -> List[List[int]]:
+        """Groups input indices into consecutive batches that respect the token and size limits."""
+        batches = []
+        current, current_tokens = [], 0
+        for index, text in enumerate(list_of_text):
+            tokens = self.count_tokens(text)
+            if current and (
+                current_tokens + tokens > self.max_batch_tokens
+                or len(current) >= self.max_batch_size
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(index)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
 
-        return embedding.data[0].embedding
+    def _backoff_delay(self, attempt: int) -> float:
+        return self.initial_backoff * (2 ** attempt) * (1 + random.random())
 
-    def get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
-        embedding_response = self.client.embeddings.create(
-            input=list_of_text, model=self.embeddings_model_name
-        )
+    async def _async_embed_batch(self, batch: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                embedding_response = await self.async_client.embeddings.create(
+                    input=batch, model=self.embeddings_model_name
+                )
+                data = sorted(embedding_response.data, key=lambda item: item.index)
+                return [embeddings.embedding for embeddings in data]
+            except RETRYABLE_ERRORS:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._backoff_delay(attempt))
 
-        return [embeddings.embedding for embeddings in embedding_response.data]
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                embedding_response = self.client.embeddings.create(
+                    input=batch, model=self.embeddings_model_name
+                )
+                data = sorted(embedding_response.data, key=lambda item: item.index)
+                return [embeddings.embedding for embeddings in data]
+            except RETRYABLE_ERRORS:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff_delay(attempt))
 
-    def get_embedding(self, text: str) -> List[float]:
-        embedding = self.client.embeddings.create(
-            input=text, model=self.embeddings_model_name
-        )
+    async def async_get_embeddings(
+        self,
+        list_of_text: List[str],
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> List[List[float]]:
+        """
+        Embeds texts in concurrent batches, preserving input order. progress_callback,
+        if given, is called with (texts embedded, total) as each batch completes.
+        """
+        batches = self.make_batches(list_of_text)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        done = 0
 
-        return embedding.data[0].embedding
+        async def embed(batch: List[int]) -> List[List[float]]:
+            nonlocal done
+            async with semaphore:
+                result = await self._async_embed_batch([list_of_text[i] for i in batch])
+            done += len(batch)
+            if progress_callback is not None:
+                progress_callback(done, len(list_of_text))
+            return result
+
+        results = await asyncio.gather(*(embed(batch) for batch in batches))
+
+        embeddings = [None] * len(list_of_text)
+        for batch, batch_embeddings in zip(batches, results):
+            for index, embedding in zip(batch, batch_embeddings):
+                embeddings[index] = embedding
+        return embeddings
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        return (await self._async_embed_batch([text]))[0]
+
+    def get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
+        embeddings = []
+        for batch in self.make_batches(list_of_text):
+            embeddings.extend(self._embed_batch([list_of_text[i] for i in batch]))
+        return embeddings
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0]
 
 
 if __name__ == "__main__":
@@ -1,7 +1,13 @@
+import json
+import os
+import shutil
 import numpy as np
 from collections import defaultdict
-from typing import List, Tuple, Callable
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from aimakerspace.openai_utils.embedding import EmbeddingModel
+from aimakerspace.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from aimakerspace.ann_index import IVFIndex
+from aimakerspace.chunks import ChunkTable
 import asyncio
 
 
@@ -13,13 +19,233 @@ def cosine_similarity(vector_a: np.array, vector_b: np.array) -> float:
     return dot_product / (norm_a * norm_b)
 
 
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scales each row to unit length so a dot product equals cosine similarity."""
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Returns the indices of the k highest scores, best first."""
+    if k >= scores.shape[-1]:
+        return np.argsort(-scores, axis=-1, kind="stable")
+    candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(
+        -np.take_along_axis(scores, candidates, axis=-1), axis=-1, kind="stable"
+    )
+    return np.take_along_axis(candidates, order, axis=-1)
+
+
 class VectorDatabase:
-    def __init__(self, embedding_model: EmbeddingModel = None):
+    """
+    Stores embeddings and runs similarity search over them.
+
+    With storage="dict" (the default) every vector lives in a dict and search
+    scores each key from Python. With storage="matrix" the vectors are kept as
+    L2-normalized float32 rows of one contiguous matrix with a parallel key
+    list, and cosine search becomes a single matrix-vector product followed by
+    an argpartition top-k. Other distance measures still work in matrix mode
+    but are evaluated against the stored normalized rows.
+
+    When an embedding_cache is given, texts are looked up there before the
+    embedding API is called and new embeddings are written back. A
+    query_cache additionally keeps recent query embeddings in memory for
+    search_by_text and search_by_texts.
+
+    Matrix storage also accepts an approximate index (IVFIndex). It is trained
+    lazily on the first cosine search once the store holds at least
+    index.min_train_size rows, and later inserts are added to it incrementally;
+    smaller stores keep using the exact scan.
+
+    Keys are usually the chunk texts themselves. abuild_from_chunks instead
+    keys each vector by the integer id of a ChunkTable record, so texts are
+    stored once in the table and identical chunks stay distinct; get_text and
+    the return_as_text search options resolve ids back to text.
+    """
+
+    def __init__(
+        self,
+        embedding_model: EmbeddingModel = None,
+        storage: str = "dict",
+        embedding_cache: Optional[EmbeddingCache] = None,
+        query_cache: Optional[QueryEmbeddingCache] = None,
+        index: Optional[IVFIndex] = None,
+    ):
+        if storage not in ("dict", "matrix"):
+            raise ValueError("storage must be either 'dict' or 'matrix'")
+        if index is not None and storage != "matrix":
+            raise ValueError("An approximate index requires storage='matrix'")
+        self.storage = storage
         self.vectors = defaultdict(np.array)
+        self.keys: List[Union[str, int]] = []
+        self._key_index: Dict[Union[str, int], int] = {}
+        # Normalized rows live in a float32 buffer with spare capacity that doubles when
+        # full; its first len(keys) rows are the matrix, so an insert never copies it
+        self._buffer: Optional[np.ndarray] = None
         self.embedding_model = embedding_model or EmbeddingModel()
+        self.embedding_cache = embedding_cache
+        self.query_cache = query_cache
+        self.metadata: Dict[str, Any] = {}
+        self.index = index
+        self.chunks: Optional[ChunkTable] = None
+
+    def _split_cached(self, texts: List[str]) -> Tuple[List[Optional[np.array]], List[str]]:
+        """Returns cached embeddings (None where missing) and the unique texts still to embed."""
+        if self.embedding_cache is None:
+            return [None] * len(texts), list(dict.fromkeys(texts))
+        embeddings = self.embedding_cache.get_many(
+            self.embedding_model.embeddings_model_name, texts
+        )
+        missing = [text for text, embedding in zip(texts, embeddings) if embedding is None]
+        return embeddings, list(dict.fromkeys(missing))
+
+    def _merge_embedded(
+        self,
+        texts: List[str],
+        embeddings: List[Optional[np.array]],
+        missing: List[str],
+        fresh: List[List[float]],
+    ) -> List[np.array]:
+        if self.embedding_cache is not None and missing:
+            self.embedding_cache.put_many(
+                self.embedding_model.embeddings_model_name, missing, fresh
+            )
+        fresh_by_text = dict(zip(missing, fresh))
+        return [
+            embedding if embedding is not None else fresh_by_text[text]
+            for text, embedding in zip(texts, embeddings)
+        ]
+
+    def embed_texts(self, texts: List[str]) -> List[np.array]:
+        """Embeds texts synchronously, consulting the embedding cache first."""
+        embeddings, missing = self._split_cached(texts)
+        fresh = self.embedding_model.get_embeddings(missing) if missing else []
+        return self._merge_embedded(texts, embeddings, missing, fresh)
 
-    def insert(self, key: str, vector: np.array) -> None:
-        self.vectors[key] = vector
+    async def aembed_texts(
+        self,
+        texts: List[str],
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> List[np.array]:
+        """
+        Embeds texts asynchronously, consulting the embedding cache first.
+        progress_callback gets (texts embedded, total); cache hits count as embedded.
+        Cache reads and writes are SQLite transactions, so they run in a worker thread.
+        """
+        if self.embedding_cache is not None:
+            embeddings, missing = await asyncio.to_thread(self._split_cached, texts)
+        else:
+            embeddings, missing = self._split_cached(texts)
+        cached = len(texts) - len(missing)
+        if progress_callback is not None:
+            progress_callback(cached, len(texts))
+        fresh = await self.embedding_model.async_get_embeddings(
+            missing,
+            progress_callback=(
+                (lambda done, _: progress_callback(cached + done, len(texts)))
+                if progress_callback is not None else None
+            ),
+        ) if missing else []
+        if self.embedding_cache is not None and missing:
+            return await asyncio.to_thread(self._merge_embedded, texts, embeddings, missing, fresh)
+        return self._merge_embedded(texts, embeddings, missing, fresh)
+
+    def __len__(self) -> int:
+        return len(self.keys) if self.storage == "matrix" else len(self.vectors)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """The (n, d) float32 matrix of normalized rows, a view of the live part of the buffer."""
+        if self._buffer is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._buffer[: len(self.keys)]
+
+    def _reserve(self, rows: int, dim: int) -> None:
+        """Makes the buffer writable with room for rows, doubling its capacity when it runs out."""
+        buffer = self._buffer
+        if buffer is not None and buffer.shape[0] >= rows and buffer.flags.writeable:
+            return
+        # A memory-mapped store is read-only; its rows are copied out on the first insert
+        capacity = max(rows, 2 * (buffer.shape[0] if buffer is not None else 0), 16)
+        grown = np.empty((capacity, dim), dtype=np.float32)
+        if buffer is not None:
+            live = len(self.keys)
+            grown[:live] = buffer[:live]
+        self._buffer = grown
+
+    def get_text(self, key: Union[str, int]) -> str:
+        """The text behind a key: the chunk text for ChunkTable ids, otherwise the key itself."""
+        if self.chunks is not None and isinstance(key, (int, np.integer)):
+            return self.chunks.get_text(key)
+        return key
+
+    def insert(self, key: Union[str, int], vector: np.array) -> None:
+        if self.storage == "dict":
+            self.vectors[key] = vector
+            return
+
+        row = _normalize_rows(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+        row_id = self._key_index.get(key)
+        if row_id is None:
+            row_id = len(self.keys)
+            self._reserve(row_id + 1, row.shape[0])
+            self._key_index[key] = row_id
+            self.keys.append(key)
+        else:
+            self._reserve(len(self.keys), row.shape[0])
+        self._buffer[row_id] = row
+        if self.index is not None and self.index.is_trained:
+            self.index.add(np.array([row_id]), row.reshape(1, -1))
+
+    def _use_index(self) -> bool:
+        """Whether cosine searches should go through the approximate index."""
+        if self.index is None:
+            return False
+        if not self.index.is_trained and len(self.keys) >= self.index.min_train_size:
+            self.index.train(self.matrix)
+        return self.index.is_trained
+
+    def _split_query_cache(self, query_texts: List[str]) -> Tuple[List[Optional[np.array]], List[str]]:
+        """Returns query-cache hits (None where missing) and the unique queries still to embed."""
+        model = self.embedding_model.embeddings_model_name
+        vectors = [self.query_cache.get(model, text) for text in query_texts]
+        missing = list(dict.fromkeys(
+            text for text, vector in zip(query_texts, vectors) if vector is None
+        ))
+        return vectors, missing
+
+    def _merge_query_cache(
+        self,
+        query_texts: List[str],
+        vectors: List[Optional[np.array]],
+        missing: List[str],
+        fresh_vectors: List[np.array],
+    ) -> List[np.array]:
+        model = self.embedding_model.embeddings_model_name
+        fresh = dict(zip(missing, fresh_vectors))
+        for text, vector in fresh.items():
+            self.query_cache.put(model, text, vector)
+        return [
+            vector if vector is not None else fresh[text]
+            for text, vector in zip(query_texts, vectors)
+        ]
+
+    def embed_queries(self, query_texts: List[str]) -> List[np.array]:
+        """Embeds search queries, serving repeats from the in-memory query cache."""
+        if self.query_cache is None:
+            return self.embed_texts(query_texts)
+        vectors, missing = self._split_query_cache(query_texts)
+        fresh = self.embed_texts(missing) if missing else []
+        return self._merge_query_cache(query_texts, vectors, missing, fresh)
+
+    async def aembed_queries(self, query_texts: List[str]) -> List[np.array]:
+        """Async variant of embed_queries for callers running on an event loop."""
+        if self.query_cache is None:
+            return await self.aembed_texts(query_texts)
+        vectors, missing = self._split_query_cache(query_texts)
+        fresh = await self.aembed_texts(missing) if missing else []
+        return self._merge_query_cache(query_texts, vectors, missing, fresh)
 
     def search(
         self,
@@ -27,12 +253,71 @@ class VectorDatabase:
         k: int,
         distance_measure: Callable = cosine_similarity,
     ) -> List[Tuple[str, float]]:
+        if self.storage == "matrix":
+            return self._search_matrix(query_vector, k, distance_measure)
+
         scores = [
             (key, distance_measure(query_vector, vector))
             for key, vector in self.vectors.items()
         ]
         return sorted(scores, key=lambda x: x[1], reverse=True)[:k]
 
+    def _search_matrix(
+        self, query_vector: np.array, k: int, distance_measure: Callable
+    ) -> List[Tuple[str, float]]:
+        if not self.keys or k <= 0:
+            return []
+
+        if distance_measure is cosine_similarity:
+            query = _normalize_rows(
+                np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+            )[0]
+            if self._use_index():
+                row_ids, row_scores = self.index.search(self.matrix, query, k)
+                return [
+                    (self.keys[index], float(score))
+                    for index, score in zip(row_ids, row_scores)
+                ]
+            scores = self.matrix @ query
+        else:
+            scores = np.array(
+                [distance_measure(query_vector, row) for row in self.matrix]
+            )
+
+        return [
+            (self.keys[index], float(scores[index]))
+            for index in _top_k_indices(scores, k)
+        ]
+
+    def search_many(
+        self,
+        query_vectors: List[np.array],
+        k: int,
+        distance_measure: Callable = cosine_similarity,
+    ) -> List[List[Tuple[str, float]]]:
+        """Returns the top k results for each query vector, in query order."""
+        if len(query_vectors) == 0:
+            return []
+        if (
+            self.storage != "matrix"
+            or distance_measure is not cosine_similarity
+            or self._use_index()
+        ):
+            return [
+                self.search(query_vector, k, distance_measure)
+                for query_vector in query_vectors
+            ]
+        if not self.keys or k <= 0:
+            return [[] for _ in query_vectors]
+
+        queries = _normalize_rows(np.asarray(query_vectors, dtype=np.float32))
+        scores = queries @ self.matrix.T
+        top_indices = _top_k_indices(scores, k)
+        return [
+            [(self.keys[index], float(row_scores[index])) for index in row_indices]
+            for row_scores, row_indices in zip(scores, top_indices)
+        ]
+
     def search_by_text(
         self,
         query_text: str,
@@ -40,19 +325,116 @@ class VectorDatabase:
         distance_measure: Callable = cosine_similarity,
         return_as_text: bool = False,
     ) -> List[Tuple[str, float]]:
-        query_vector = self.embedding_model.get_embedding(query_text)
+        query_vector = self.embed_queries([query_text])[0]
         results = self.search(query_vector, k, distance_measure)
-        return [result[0] for result in results] if return_as_text else results
+        return [self.get_text(result[0]) for result in results] if return_as_text else results
+
+    def search_by_texts(
+        self,
+        query_texts: List[str],
+        k: int,
+        distance_measure: Callable = cosine_similarity,
+        return_as_text: bool = False,
+    ) -> List[List[Tuple[str, float]]]:
+        """Embeds all queries in one request and searches them in one pass."""
+        if not query_texts:
+            return []
+        query_vectors = self.embed_queries(query_texts)
+        results = self.search_many(query_vectors, k, distance_measure)
+        if return_as_text:
+            return [[self.get_text(result[0]) for result in query_results] for query_results in results]
+        return results
 
-    def retrieve_from_key(self, key: str) -> np.array:
+    async def asearch_by_text(
+        self,
+        query_text: str,
+        k: int,
+        distance_measure: Callable = cosine_similarity,
+        return_as_text: bool = False,
+    ) -> List[Tuple[str, float]]:
+        query_vector = (await self.aembed_queries([query_text]))[0]
+        results = self.search(query_vector, k, distance_measure)
+        return [self.get_text(result[0]) for result in results] if return_as_text else results
+
+    def retrieve_from_key(self, key: Union[str, int]) -> np.array:
+        if self.storage == "matrix":
+            index = self._key_index.get(key)
+            return None if index is None else self.matrix[index]
         return self.vectors.get(key, None)
 
-    async def abuild_from_list(self, list_of_text: List[str]) -> "VectorDatabase":
-        embeddings = await self.embedding_model.async_get_embeddings(list_of_text)
+    async def abuild_from_list(
+        self,
+        list_of_text: List[str],
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> "VectorDatabase":
+        embeddings = await self.aembed_texts(list_of_text, progress_callback)
         for text, embedding in zip(list_of_text, embeddings):
             self.insert(text, np.array(embedding))
         return self
 
+    async def abuild_from_chunks(
+        self,
+        chunks: ChunkTable,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> "VectorDatabase":
+        """Embeds every chunk of the table and keys its vector by the chunk's integer id."""
+        embeddings = await self.aembed_texts(chunks.texts(), progress_callback)
+        self.chunks = chunks
+        for chunk_id, embedding in enumerate(embeddings):
+            self.insert(chunk_id, np.array(embedding))
+        return self
+
+    def save(self, path: str) -> None:
+        """
+        Writes the store to a directory as vectors.npy (the raw float32 matrix)
+        plus keys.json (keys, metadata and embedding model name), and the
+        ChunkTable if there is one. The directory is replaced atomically so a
+        crash mid-save never leaves a torn store.
+        """
+        if self.storage != "matrix":
+            raise ValueError("Only matrix storage can be saved")
+
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, "vectors.npy"), self.matrix)
+        with open(os.path.join(tmp_path, "keys.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "keys": self.keys,
+                    "metadata": self.metadata,
+                    "embeddings_model_name": self.embedding_model.embeddings_model_name,
+                },
+                f,
+            )
+        if self.chunks is not None:
+            self.chunks.save(tmp_path)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(
+        cls, path: str, embedding_model: EmbeddingModel = None, mmap: bool = True, **kwargs
+    ) -> "VectorDatabase":
+        """
+        Loads a store written by save(). With mmap=True the matrix is memory-mapped
+        read-only, so only the pages touched by searches become resident.
+        """
+        with open(os.path.join(path, "keys.json"), "r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+
+        vector_db = cls(embedding_model, storage="matrix", **kwargs)
+        vector_db._buffer = np.load(
+            os.path.join(path, "vectors.npy"), mmap_mode="r" if mmap else None
+        )
+        vector_db.keys = sidecar["keys"]
+        vector_db._key_index = {key: index for index, key in enumerate(vector_db.keys)}
+        vector_db.metadata = sidecar.get("metadata", {})
+        vector_db.chunks = ChunkTable.load(path, mmap=mmap)
+        if len(vector_db.keys) != vector_db._buffer.shape[0]:
+            raise ValueError(f"Vector store at '{path}' has mismatched keys and vectors")
+        return vector_db
+
 
 if __name__ == "__main__":
     list_of_text = [
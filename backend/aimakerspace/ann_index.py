@@ -0,0 +1,114 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest neighbour index in pure NumPy.
+
+    Rows are clustered with spherical k-means into n_lists cells. A search
+    scores the query against the centroids, scans only the rows in the
+    n_probe closest cells and returns their exact cosine scores. Raising
+    n_probe trades speed for recall; n_probe == n_lists is an exact scan.
+
+    The index only stores row ids; vectors stay in the owning
+    VectorDatabase's normalized matrix, which is passed to every call.
+    """
+
+    def __init__(
+        self,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        kmeans_iterations: int = 10,
+        min_train_size: int = 1024,
+        seed: int = 0,
+    ):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.kmeans_iterations = kmeans_iterations
+        self.min_train_size = min_train_size
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._list_arrays: List[Optional[np.ndarray]] = []
+        self._assignments: List[int] = []
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, matrix: np.ndarray) -> None:
+        """Clusters the rows of matrix and assigns every row to a cell."""
+        n_rows = matrix.shape[0]
+        n_lists = self.n_lists or max(1, int(np.sqrt(n_rows)))
+        n_lists = min(n_lists, n_rows)
+        rng = np.random.default_rng(self.seed)
+
+        # Train on a sample; assignment below still covers every row
+        sample_size = min(n_rows, n_lists * 256)
+        sample = np.asarray(matrix[rng.choice(n_rows, sample_size, replace=False)])
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for cell in range(n_lists):
+                members = sample[labels == cell]
+                if len(members):
+                    centroids[cell] = members.sum(axis=0)
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (centroids / norms).astype(np.float32)
+
+        self.centroids = centroids
+        self._lists = [[] for _ in range(n_lists)]
+        self._list_arrays = [None] * n_lists
+        self._assignments = []
+        self.add(np.arange(n_rows), matrix)
+
+    def _assign(self, rows: np.ndarray) -> np.ndarray:
+        assignments = np.empty(len(rows), dtype=np.int64)
+        # Assign in blocks to bound the temporary (block, n_lists) score matrix
+        for start in range(0, len(rows), 8192):
+            block = np.asarray(rows[start : start + 8192])
+            assignments[start : start + len(block)] = np.argmax(
+                block @ self.centroids.T, axis=1
+            )
+        return assignments
+
+    def add(self, row_ids: np.ndarray, rows: np.ndarray) -> None:
+        """Inserts rows (already normalized) under the given row ids without retraining."""
+        for row_id, cell in zip(row_ids, self._assign(rows)):
+            row_id, cell = int(row_id), int(cell)
+            if row_id < len(self._assignments):
+                # Overwritten key: move the row out of its old cell
+                old_cell = self._assignments[row_id]
+                self._lists[old_cell].remove(row_id)
+                self._list_arrays[old_cell] = None
+                self._assignments[row_id] = cell
+            else:
+                self._assignments.append(cell)
+            self._lists[cell].append(row_id)
+            self._list_arrays[cell] = None
+
+    def _cell_ids(self, cell: int) -> np.ndarray:
+        if self._list_arrays[cell] is None:
+            self._list_arrays[cell] = np.asarray(self._lists[cell], dtype=np.int64)
+        return self._list_arrays[cell]
+
+    def search(
+        self, matrix: np.ndarray, query: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns (row ids, scores) of the approximate top k rows for one normalized query."""
+        n_probe = min(self.n_probe, len(self._lists))
+        cells = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+        candidates = np.concatenate([self._cell_ids(int(cell)) for cell in cells])
+        if len(candidates) == 0:
+            return candidates, np.empty(0, dtype=np.float32)
+
+        scores = matrix[candidates] @ query
+        if k < len(candidates):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return candidates[top], scores[top]
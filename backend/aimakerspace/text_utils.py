@@ -1,7 +1,18 @@
 import os
-from typing import List
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple
 import PyPDF2
 
+from aimakerspace.chunks import ChunkTable
+
+try:
+    import fitz  # PyMuPDF, optional faster extraction backend
+except ImportError:
+    fitz = None
+
+PDF_BACKENDS = ("pypdf2", "pymupdf")
+
 
 class TextFileLoader:
     def __init__(self, path: str, encoding: str = "utf-8"):
@@ -37,7 +48,30 @@ class TextFileLoader:
         return self.documents
 
 
-class CharacterTextSplitter:
+class TextSplitter:
+    """Base for splitters: subclasses implement split_spans, the rest is shared."""
+
+    def split_spans(self, text: str) -> List[Tuple[int, int]]:
+        """(start, end) offsets of each chunk in text."""
+        raise NotImplementedError
+
+    def split(self, text: str) -> List[str]:
+        return [text[start:end] for start, end in self.split_spans(text)]
+
+    def split_texts(self, texts: List[str]) -> List[str]:
+        chunks = []
+        for text in texts:
+            chunks.extend(self.split(text))
+        return chunks
+
+    def split_to_table(
+        self, texts: List[str], page_starts: Optional[List[List[int]]] = None
+    ) -> ChunkTable:
+        """Splits texts into a ChunkTable of offset records over one shared text buffer."""
+        return ChunkTable.from_spans(texts, [self.split_spans(text) for text in texts], page_starts)
+
+
+class CharacterTextSplitter(TextSplitter):
     def __init__(
         self,
         chunk_size: int = 1000,
@@ -50,23 +84,209 @@ class CharacterTextSplitter:
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
 
-    def split(self, text: str) -> List[str]:
-        chunks = []
-        for i in range(0, len(text), self.chunk_size - self.chunk_overlap):
-            chunks.append(text[i : i + self.chunk_size])
-        return chunks
+    def split_spans(self, text: str) -> List[Tuple[int, int]]:
+        return [
+            (i, min(i + self.chunk_size, len(text)))
+            for i in range(0, len(text), self.chunk_size - self.chunk_overlap)
+        ]
 
-    def split_texts(self, texts: List[str]) -> List[str]:
-        chunks = []
-        for text in texts:
-            chunks.extend(self.split(text))
-        return chunks
+
+# Boundary strengths, strongest first; a chunk prefers to end on the strongest one available
+PARAGRAPH, LINE, SENTENCE, WORD, NONE = 4, 3, 2, 1, 0
+# Paragraph break, line break, or sentence end (terminal punctuation, optional closing quote/bracket, whitespace)
+_BOUNDARY = re.compile(r"\n[ \t]*\n\s*|\n\s*|[.!?][\"')\]]*\s+")
+_WORD = re.compile(r"\S+\s*|\s+")
+
+
+class TokenTextSplitter(TextSplitter):
+    """
+    Splits text into chunks of at most chunk_tokens tokens that end on natural
+    boundaries: a paragraph break if one falls in the last part of the chunk,
+    otherwise a line break, sentence end, or word gap, in that order.
+
+    The text is cut into sentence/line segments in one regex pass and each
+    segment is tokenized once; segments longer than a chunk are broken at
+    words (and, for a single giant word, by characters). Chunks are then
+    packed greedily from the segments, so the whole split is linear in the
+    text length. Consecutive chunks share up to chunk_overlap tokens of whole
+    segments.
+
+    Token counts are summed per segment and may differ from encoding a whole
+    chunk by a token at segment joins. Without a tokenizer (tiktoken missing
+    or its BPE file not downloadable) counts fall back to ~4 characters per token.
+    """
+
+    def __init__(
+        self,
+        chunk_tokens: int = 256,
+        chunk_overlap: int = 32,
+        encoding_name: str = "cl100k_base",
+        min_fill: float = 0.5,
+    ):
+        assert (
+            chunk_tokens > chunk_overlap
+        ), "Chunk size must be greater than chunk overlap"
+
+        self.chunk_tokens = chunk_tokens
+        self.chunk_overlap = chunk_overlap
+        # A boundary only wins over a later, weaker one once the chunk is this full
+        self.min_fill_tokens = int(chunk_tokens * min_fill)
+        try:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding(encoding_name)
+        except Exception:
+            self._encoding = None
+
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        if self._encoding is None:
+            return [(len(text) + 3) // 4 for text in texts]
+        return [len(tokens) for tokens in self._encoding.encode_ordinary_batch(texts)]
+
+    def _segments(self, text: str) -> List[Tuple[int, int, int]]:
+        """(start, end, boundary strength at end) of each sentence/line segment."""
+        segments, start = [], 0
+        for match in _BOUNDARY.finditer(text):
+            boundary = match.group()
+            if "\n" in boundary:
+                strength = PARAGRAPH if boundary.count("\n") > 1 else LINE
+            else:
+                strength = SENTENCE
+            segments.append((start, match.end(), strength))
+            start = match.end()
+        if start < len(text):
+            segments.append((start, len(text), PARAGRAPH))
+        return segments
+
+    def _split_oversized(
+        self, text: str, start: int, end: int, strength: int, tokens: int
+    ) -> Tuple[List[Tuple[int, int, int]], List[int]]:
+        """Breaks one segment longer than a chunk into word (or character) pieces."""
+        words = [(m.start(), m.end()) for m in _WORD.finditer(text, start, end)]
+        word_tokens = self.count_tokens_batch([text[a:b] for a, b in words])
+        pieces, piece_tokens = [], []
+        for (a, b), count in zip(words, word_tokens):
+            if count <= self.chunk_tokens:
+                pieces.append((a, b, WORD))
+                piece_tokens.append(count)
+                continue
+            # A single "word" longer than a chunk (e.g. an encoded blob): cut by characters
+            step = max(1, (b - a) * self.chunk_tokens // count)
+            for piece_start in range(a, b, step):
+                piece_end = min(piece_start + step, b)
+                pieces.append((piece_start, piece_end, NONE))
+                piece_tokens.append(min(self.chunk_tokens, count * (piece_end - piece_start) // (b - a) + 1))
+        if pieces:
+            last_start, last_end, _ = pieces[-1]
+            pieces[-1] = (last_start, last_end, strength)
+        return pieces, piece_tokens
+
+    def split_spans(self, text: str) -> List[Tuple[int, int]]:
+        segments = self._segments(text)
+        segment_tokens = self.count_tokens_batch([text[start:end] for start, end, _ in segments])
+
+        units, unit_tokens = [], []
+        for (start, end, strength), tokens in zip(segments, segment_tokens):
+            if tokens > self.chunk_tokens:
+                pieces, piece_tokens = self._split_oversized(text, start, end, strength, tokens)
+                units.extend(pieces)
+                unit_tokens.extend(piece_tokens)
+            else:
+                units.append((start, end, strength))
+                unit_tokens.append(tokens)
+
+        spans = []
+        first, n_units = 0, len(units)
+        while first < n_units:
+            # Grow the chunk unit by unit, remembering the best place to cut
+            total, last = 0, first
+            cut, cut_strength = None, -1
+            while last < n_units and total + unit_tokens[last] <= self.chunk_tokens:
+                total += unit_tokens[last]
+                last += 1
+                strength = units[last - 1][2]
+                if total >= self.min_fill_tokens and strength >= cut_strength:
+                    cut, cut_strength = last, strength
+            if last == first:
+                last = first + 1  # a unit can only exceed the budget through rounding; take it alone
+            if last == n_units or cut is None:
+                cut = last
+
+            chunk_start, chunk_end = units[first][0], units[cut - 1][1]
+            while chunk_end > chunk_start and text[chunk_end - 1].isspace():
+                chunk_end -= 1
+            if chunk_end > chunk_start:
+                spans.append((chunk_start, chunk_end))
+            if cut == n_units:
+                break
+
+            # Start the next chunk up to chunk_overlap tokens back, on a unit boundary
+            next_first, overlap = cut, 0
+            while next_first - 1 > first and overlap + unit_tokens[next_first - 1] <= self.chunk_overlap:
+                next_first -= 1
+                overlap += unit_tokens[next_first]
+            first = next_first
+        return spans
+
+
+def _page_count(path: str, backend: str) -> int:
+    if backend == "pymupdf":
+        with fitz.open(path) as document:
+            return document.page_count
+    with open(path, "rb") as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def _iter_pages(path: str, backend: str, start: int, stop: int) -> Iterator[str]:
+    if backend == "pymupdf":
+        with fitz.open(path) as document:
+            for i in range(start, stop):
+                yield document[i].get_text()
+        return
+    with open(path, "rb") as file:
+        pages = PyPDF2.PdfReader(file).pages
+        for i in range(start, stop):
+            yield pages[i].extract_text()
+
+
+def _extract_page_range(path: str, backend: str, start: int, stop: int) -> List[str]:
+    """Text of pages [start, stop). Module-level so process pool workers can run it."""
+    return list(_iter_pages(path, backend, start, stop))
 
 
 class PDFLoader:
-    def __init__(self, path: str):
+    """
+    Loads the text of a PDF (or every PDF in a directory), one document per file.
+
+    With workers > 1, files of at least min_parallel_pages pages are split into
+    contiguous page ranges that are extracted in a process pool and joined in
+    page order. Pass executor to reuse a long-lived pool instead of starting one
+    per file. backend selects PyPDF2 ("pypdf2") or the faster PyMuPDF ("pymupdf").
+    progress_callback, if given, is called with (pages extracted, total pages)
+    as extraction advances. page_starts holds, per document, the offset at
+    which each page's text begins.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        backend: str = "pypdf2",
+        workers: int = 1,
+        min_parallel_pages: int = 32,
+        executor: Optional[Executor] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ):
+        if backend not in PDF_BACKENDS:
+            raise ValueError(f"Unknown PDF backend '{backend}', expected one of {PDF_BACKENDS}")
+        if backend == "pymupdf" and fitz is None:
+            raise ValueError("PDF backend 'pymupdf' requires the PyMuPDF package")
         self.documents = []
+        self.page_starts: List[List[int]] = []
         self.path = path
+        self.backend = backend
+        self.workers = workers
+        self.min_parallel_pages = min_parallel_pages
+        self.executor = executor
+        self.progress_callback = progress_callback
         print(f"PDFLoader initialized with path: {self.path}")
 
     def load(self):
@@ -89,32 +309,62 @@ class PDFLoader:
         except Exception as e:
             raise ValueError(f"Error processing file at '{self.path}': {str(e)}")
 
+    def _page_ranges(self, page_count: int) -> List[Tuple[int, int]]:
+        # Two ranges per worker so one slow range does not leave the others idle
+        n_ranges = min(page_count, self.workers * 2)
+        size = -(-page_count // n_ranges)
+        return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+    def extract_text(self, path: str) -> Tuple[str, List[int]]:
+        """Returns the text of the PDF at path and the start offset of each page in it."""
+        page_count = _page_count(path, self.backend)
+        report = self.progress_callback or (lambda done, total: None)
+        report(0, page_count)
+        if self.workers <= 1 or page_count < self.min_parallel_pages:
+            pages = []
+            for page in _iter_pages(path, self.backend, 0, page_count):
+                pages.append(page)
+                report(len(pages), page_count)
+        else:
+            ranges = self._page_ranges(page_count)
+            executor = self.executor or ProcessPoolExecutor(max_workers=self.workers)
+            try:
+                # map() yields results in submission order, so pages stay in order
+                results = executor.map(
+                    _extract_page_range,
+                    [path] * len(ranges),
+                    [self.backend] * len(ranges),
+                    [start for start, _ in ranges],
+                    [stop for _, stop in ranges],
+                )
+                pages = []
+                for page_range in results:
+                    pages.extend(page_range)
+                    report(len(pages), page_count)
+            finally:
+                if executor is not self.executor:
+                    executor.shutdown()
+
+        page_starts, offset = [], 0
+        for page in pages:
+            page_starts.append(offset)
+            offset += len(page) + 1
+        # One join instead of repeated concatenation (quadratic in the document length)
+        return "".join(page + "\n" for page in pages), page_starts
+
+    def _add_document(self, path: str) -> None:
+        text, page_starts = self.extract_text(path)
+        self.documents.append(text)
+        self.page_starts.append(page_starts)
+
     def load_file(self):
-        with open(self.path, 'rb') as file:
-            # Create PDF reader object
-            pdf_reader = PyPDF2.PdfReader(file)
-            
-            # Extract text from each page
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            
-            self.documents.append(text)
+        self._add_document(self.path)
 
     def load_directory(self):
         for root, _, files in os.walk(self.path):
             for file in files:
                 if file.lower().endswith('.pdf'):
-                    file_path = os.path.join(root, file)
-                    with open(file_path, 'rb') as f:
-                        pdf_reader = PyPDF2.PdfReader(f)
-                        
-                        # Extract text from each page
-                        text = ""
-                        for page in pdf_reader.pages:
-                            text += page.extract_text() + "\n"
-                        
-                        self.documents.append(text)
+                    self._add_document(os.path.join(root, file))
 
     def load_documents(self):
         self.load()
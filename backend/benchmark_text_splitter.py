@@ -0,0 +1,110 @@
+"""
+Benchmark CharacterTextSplitter against TokenTextSplitter.
+
+Splits a large corpus with each splitter and reports throughput plus chunk
+statistics: chunk count, token counts (mean, p5, p95, max), how many chunks
+end on a sentence or paragraph boundary, and how many cut through a word.
+
+The corpus is either the given .txt/.pdf files or synthetic prose with
+paragraphs of varying length (no downloads needed):
+
+    python benchmark_text_splitter.py --megabytes 20
+    python benchmark_text_splitter.py --files report.pdf notes.txt
+
+Token counts use tiktoken when its encoding is available, otherwise the
+~4 characters per token estimate the splitter itself falls back to.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from aimakerspace.text_utils import CharacterTextSplitter, PDFLoader, TokenTextSplitter
+
+WORDS = (
+    "market entry strategy requires careful analysis of competitors pricing and "
+    "distribution channels while customer acquisition cost and lifetime value drive "
+    "the unit economics of a scalable subscription business model in 2024 revenue grew 3.5% "
+    "e.g. through partnerships regulatory approval supply chain resilience"
+).split()
+
+
+def synthetic_corpus(megabytes: float, seed: int) -> str:
+    rng = random.Random(seed)
+    paragraphs, size = [], 0
+    while size < megabytes * 1_000_000:
+        sentences = []
+        for _ in range(rng.randint(1, 10)):
+            sentence = " ".join(rng.choices(WORDS, k=rng.randint(4, 40))).capitalize()
+            sentences.append(sentence + rng.choice([".", ".", ".", "?", "!"]))
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+
+def load_corpus(files) -> str:
+    documents = []
+    for path in files:
+        if path.lower().endswith(".pdf"):
+            documents.extend(PDFLoader(path).load_documents())
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                documents.append(f.read())
+    return "\n\n".join(documents)
+
+
+def chunk_stats(text, spans, count_tokens):
+    tokens = np.array(count_tokens([text[start:end] for start, end in spans]))
+    at_sentence = sum(text[end - 1] in ".!?\"')]" or text[end:end + 2] == "\n\n" for _, end in spans)
+    mid_word = sum(
+        end < len(text) and text[end - 1].isalnum() and text[end].isalnum()
+        for _, end in spans
+    )
+    return {
+        "chunks": len(spans),
+        "tokens_mean": tokens.mean(),
+        "tokens_p5": np.percentile(tokens, 5),
+        "tokens_p95": np.percentile(tokens, 95),
+        "tokens_max": tokens.max(),
+        "sentence_end": at_sentence / len(spans),
+        "mid_word": mid_word / len(spans),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", nargs="*")
+    parser.add_argument("--megabytes", type=float, default=10.0)
+    parser.add_argument("--chunk-size", type=int, default=1000, help="CharacterTextSplitter characters")
+    parser.add_argument("--chunk-overlap", type=int, default=200, help="CharacterTextSplitter characters")
+    parser.add_argument("--chunk-tokens", type=int, default=256)
+    parser.add_argument("--chunk-overlap-tokens", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    text = load_corpus(args.files) if args.files else synthetic_corpus(args.megabytes, args.seed)
+    token_splitter = TokenTextSplitter(args.chunk_tokens, args.chunk_overlap_tokens)
+    splitters = {
+        "character": CharacterTextSplitter(args.chunk_size, args.chunk_overlap),
+        "token": token_splitter,
+    }
+    tokenizer = "tiktoken" if token_splitter._encoding is not None else "estimate (~4 chars/token)"
+    print(f"Corpus: {len(text) / 1e6:.1f} MB, tokenizer: {tokenizer}")
+
+    for name, splitter in splitters.items():
+        start = time.perf_counter()
+        spans = splitter.split_spans(text)
+        elapsed = time.perf_counter() - start
+        stats = chunk_stats(text, spans, token_splitter.count_tokens_batch)
+        print(
+            f"{name:>10}  {len(text) / 1e6 / elapsed:6.2f} MB/s  chunks={stats['chunks']:6d}  "
+            f"tokens mean={stats['tokens_mean']:6.1f} p5={stats['tokens_p5']:5.0f} "
+            f"p95={stats['tokens_p95']:5.0f} max={stats['tokens_max']:5.0f}  "
+            f"sentence-end={stats['sentence_end']:6.1%}  mid-word={stats['mid_word']:6.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
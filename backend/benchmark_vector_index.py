@@ -0,0 +1,84 @@
+"""
+Benchmark exact vs IVF approximate search in VectorDatabase.
+
+Builds a synthetic, clustered "library" of embeddings (no API calls), then
+reports recall@k against the exact matrix scan and per-query latency for a
+range of n_probe settings.
+
+    python benchmark_vector_index.py --rows 100000 --dim 1536 --k 5
+"""
+import argparse
+import time
+
+import numpy as np
+
+from aimakerspace.vectordatabase import VectorDatabase
+from aimakerspace.ann_index import IVFIndex
+
+
+class _NoEmbeddings:
+    """Stands in for EmbeddingModel; the benchmark only searches by vector."""
+    embeddings_model_name = "benchmark"
+
+
+def make_corpus(rows: int, dim: int, topics: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dim)).astype(np.float32)
+    labels = rng.integers(0, topics, size=rows)
+    return centers[labels] + 0.6 * rng.normal(size=(rows, dim)).astype(np.float32)
+
+
+def build(vectors: np.ndarray, index=None) -> VectorDatabase:
+    vector_db = VectorDatabase(_NoEmbeddings(), storage="matrix", index=index)
+    for i, vector in enumerate(vectors):
+        vector_db.insert(f"chunk-{i}", vector)
+    return vector_db
+
+
+def time_queries(vector_db: VectorDatabase, queries: np.ndarray, k: int):
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append([key for key, _ in vector_db.search(query, k)])
+        latencies.append(time.perf_counter() - start)
+    return results, np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--n-lists", type=int, default=None)
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.rows, args.dim, args.topics, args.seed)
+    queries = make_corpus(args.queries, args.dim, args.topics, args.seed + 1)
+
+    print(f"Corpus: {args.rows} x {args.dim}, {args.queries} queries, k={args.k}")
+    exact_db = build(corpus)
+    exact_db.search(queries[0], args.k)  # materialize the matrix outside the timings
+    exact_results, exact_ms = time_queries(exact_db, queries, args.k)
+    print(f"{'exact':>14}  recall@{args.k}=1.000  p50={np.median(exact_ms):7.2f} ms  p95={np.percentile(exact_ms, 95):7.2f} ms")
+
+    ivf_db = build(corpus, IVFIndex(n_lists=args.n_lists, seed=args.seed))
+    start = time.perf_counter()
+    ivf_db.search(queries[0], args.k)  # trains the index
+    print(f"IVF training: {time.perf_counter() - start:.2f} s, {len(ivf_db.index.centroids)} lists")
+
+    for n_probe in args.n_probe:
+        ivf_db.index.n_probe = n_probe
+        results, ms = time_queries(ivf_db, queries, args.k)
+        recall = np.mean([
+            len(set(approx) & set(exact)) / len(exact)
+            for approx, exact in zip(results, exact_results)
+        ])
+        print(f"{'ivf n_probe=' + str(n_probe):>14}  recall@{args.k}={recall:.3f}  p50={np.median(ms):7.2f} ms  p95={np.percentile(ms, 95):7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+History assembly for chat turns.
+
+Only the most recent messages that fit a token budget are sent to the model.
+They are read newest-first in LIMIT-ed pages, so the cost of a turn does not
+grow with the length of the conversation. Turns that fall out of the window
+are folded into a rolling summary cached on the Conversation row.
+"""
+import os
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select  # type: ignore
+from sqlalchemy.orm import Session  # type: ignore
+
+from fastapi.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from models import Conversation, Message
+from openai_service import OpenAIService
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "6000"))
+HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "20"))
+# Upper bound on messages folded into the summary per refresh, so a first refresh of a long conversation stays cheap
+SUMMARY_BATCH_LIMIT = int(os.getenv("CHAT_SUMMARY_BATCH_LIMIT", "200"))
+# Per-message overhead of the chat format (role, separators)
+MESSAGE_TOKEN_OVERHEAD = 4
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    # Tokenizer unavailable (not installed or BPE file not downloadable); fall back to an estimate
+    _encoding = None
+
+
+def count_tokens(text: str) -> int:
+    if _encoding is None:
+        return len(text) // 4 + 1
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def older_than(message: Message):
+    """Filter for messages strictly before `message` in (created_at, id) order."""
+    # Compare against the stored timestamp in SQL rather than a bound Python
+    # datetime, whose string form can differ from the stored one (e.g. SQLite)
+    cursor_created_at = (
+        select(Message.created_at).where(Message.id == message.id).scalar_subquery()
+    )
+    return or_(
+        Message.created_at < cursor_created_at,
+        and_(Message.created_at == cursor_created_at, Message.id < message.id),
+    )
+
+
+def load_history_window(
+    db: Session,
+    conversation_id: int,
+    token_budget: int = HISTORY_TOKEN_BUDGET,
+    page_size: int = HISTORY_PAGE_SIZE,
+) -> Tuple[List[Message], bool]:
+    """
+    Return the newest messages that fit in token_budget (oldest first) and
+    whether older messages exist outside the window.
+    """
+    window: List[Message] = []
+    used = 0
+    cursor: Optional[Message] = None
+    while True:
+        query = db.query(Message).filter(Message.conversation_id == conversation_id)
+        if cursor is not None:
+            query = query.filter(older_than(cursor))
+        page = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(page_size).all()
+
+        for message in page:
+            tokens = count_tokens(message.content) + MESSAGE_TOKEN_OVERHEAD
+            if used + tokens > token_budget:
+                window.reverse()
+                return window, True
+            used += tokens
+            window.append(message)
+
+        if len(page) < page_size:
+            window.reverse()
+            return window, False
+        cursor = page[-1]
+
+
+def build_conversation_history(db: Session, conversation: Conversation) -> List[Dict[str, str]]:
+    """
+    Assemble the OpenAI-format history: cached summary of older turns, then the recent window
+    """
+    window, _ = load_history_window(db, conversation.id)
+    history = []
+    if conversation.summary:
+        history.append({
+            "role": "system",
+            "content": f"Summary of the earlier part of this conversation:\n{conversation.summary}"
+        })
+    history.extend({"role": msg.role, "content": msg.content} for msg in window)
+    return history
+
+
+def messages_to_summarize(db: Session, conversation: Conversation) -> List[Message]:
+    """
+    Messages that have fallen out of the history window but are not yet in the summary
+    """
+    window, has_older = load_history_window(db, conversation.id)
+    if not has_older:
+        return []
+
+    query = db.query(Message).filter(Message.conversation_id == conversation.id)
+    if window:
+        query = query.filter(older_than(window[0]))
+    if conversation.summary_through_message_id is not None:
+        query = query.filter(Message.id > conversation.summary_through_message_id)
+    return query.order_by(Message.created_at, Message.id).limit(SUMMARY_BATCH_LIMIT).all()
+
+
+def save_summary(db: Session, conversation_id: int, summary: str, through_message_id: int) -> None:
+    conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+    if conversation is None:
+        return
+    conversation.summary = summary
+    conversation.summary_through_message_id = through_message_id
+    db.commit()
+
+
+def _load_summary_work(conversation_id: int) -> Tuple[Optional[str], List[Dict[str, str]], Optional[int]]:
+    db = SessionLocal()
+    try:
+        conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+        if conversation is None:
+            return None, [], None
+        pending = messages_to_summarize(db, conversation)
+        return (
+            conversation.summary,
+            [{"role": msg.role, "content": msg.content} for msg in pending],
+            pending[-1].id if pending else None,
+        )
+    finally:
+        db.close()
+
+
+def _save_summary_in_new_session(conversation_id: int, summary: str, through_message_id: int) -> None:
+    db = SessionLocal()
+    try:
+        save_summary(db, conversation_id, summary, through_message_id)
+    finally:
+        db.close()
+
+
+async def refresh_conversation_summary(conversation_id: int, api_key: str) -> None:
+    """
+    Fold turns that left the history window into the rolling summary.
+    Meant to run as a background task after the response has been sent.
+    """
+    try:
+        previous_summary, pending, through_message_id = await run_in_threadpool(
+            _load_summary_work, conversation_id
+        )
+        if not pending:
+            return
+        summary = await OpenAIService(api_key).asummarize_history(previous_summary, pending)
+        await run_in_threadpool(_save_summary_in_new_session, conversation_id, summary, through_message_id)
+    except Exception as e:
+        # Best effort: the next turn retries, so a failure here must not surface to the client
+        print(f"Conversation {conversation_id}: summary refresh failed: {str(e)}")
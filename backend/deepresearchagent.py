@@ -1,22 +1,46 @@
 
 
-from typing import TypedDict, Annotated, Optional, List, Dict
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import TypedDict, Annotated, Any, AsyncIterator, Callable, Optional, List, Dict, Tuple
 from langgraph.graph.message import add_messages
 import operator
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
-from langgraph.prebuilt import ToolNode
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
 from langgraph.graph import StateGraph, END
+from langgraph.config import get_stream_writer
 from langchain_tavily import TavilySearch
 from langchain_community.tools import WikipediaQueryRun
 from langchain_community.utilities import WikipediaAPIWrapper
 from langchain_openai import ChatOpenAI
 from langchain_core.tools import tool
-import requests
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 import fitz  # PyMuPDF
 import io
 from langchain_experimental.tools import PythonREPLTool
 import datetime
 
+from research_http import PUBMED_BASE_URL, get_session
+from tool_cache import get_tool_cache, parse_tool_settings
+
+# Tools and models are built once per (OpenAI key, Tavily key) pair and reused
+# across steps and runs; the least recently used pairs are evicted first
+RESEARCH_TOOLSET_CACHE_SIZE = int(os.getenv("RESEARCH_TOOLSET_CACHE_SIZE", "32"))
+# Tool calls of one model turn run concurrently on a shared pool of this many threads
+RESEARCH_TOOL_WORKERS = int(os.getenv("RESEARCH_TOOL_WORKERS", "8"))
+# Seconds a tool call may run before it is reported as timed out; per-tool
+# overrides as RESEARCH_TOOL_TIMEOUTS="pdf_parser=120,code_interpreter=30"
+RESEARCH_TOOL_TIMEOUT_SECONDS = float(os.getenv("RESEARCH_TOOL_TIMEOUT_SECONDS", "45"))
+TOOL_TIMEOUTS = {
+    "query_enhancer": 60.0,
+    "pdf_parser": 90.0,
+    **parse_tool_settings(os.getenv("RESEARCH_TOOL_TIMEOUTS", "")),
+}
+
 
 class ResearchStep(TypedDict):
     step_number: int
@@ -24,11 +48,10 @@ class ResearchStep(TypedDict):
     tool_input: str
     tool_output: str
     timestamp: str
+    cached: bool
 
 class AgentState(TypedDict):
     messages: Annotated[list, add_messages]
-    openai_api_key: str
-    tavily_api_key: Optional[str]
     research_steps: List[ResearchStep]
     step_counter: int
 
@@ -45,19 +68,11 @@ def create_model(api_key: str) -> ChatOpenAI:
     )
 
 
-def call_model(state: AgentState):
-    """Agent node that calls the LLM"""
+def _prepare_model_call(state: AgentState, config: RunnableConfig):
+    """Pick the model (with or without tools) and the messages for the next agent step"""
     messages = state["messages"]
     research_steps = state.get("research_steps", [])
-    
-    # Get the API key from state - it should be passed in the initial state
-    api_key = state.get("openai_api_key", "")
-    if not api_key:
-        raise ValueError("OpenAI API key not found in state")
-    
-    # Bind tools to the model
-    tools = create_tools(state.get("tavily_api_key"), api_key)
-    model = create_model(api_key).bind_tools(tools)
+    toolset = toolset_from_config(config)
     
     # Check if we should provide a final answer
     if len(research_steps) >= 5:  # After at least 5 research steps, provide final answer
@@ -86,10 +101,9 @@ Acknowledge any limitations of the research you performed, including gaps in ava
 
 Provide detailed, in-depth insights. Do not mention the research tools or process - focus on delivering authoritative healthcare compliance analysis."""
         
-        # Create a model without tools for final answer
-        final_model = create_model(api_key)
+        # Use the model without tools for final answer
         messages = messages + [HumanMessage(content=final_system_message)]
-        response = final_model.invoke(messages)
+        return toolset.model, messages
     else:
         # Initial system message for tool usage
         system_message = """You are a skilled research analyst from a clinical/legal firm specializing in healthcare regulations and compliance. Your expertise covers HIPAA, healthcare policy, medical regulations, and compliance frameworks.
@@ -126,25 +140,36 @@ Begin by FIRST using the query_enhancer tool with the user's original question,
         if not any(isinstance(msg, HumanMessage) and msg.content.startswith("You are a skilled research analyst") for msg in messages):
             messages = [HumanMessage(content=system_message)] + messages
         
-        response = model.invoke(messages)
-    
-    return {"messages": [response]}
+    return toolset.tool_model, messages
+
+
+def call_model(state: AgentState, config: RunnableConfig):
+    """Agent node that calls the LLM"""
+    model, messages = _prepare_model_call(state, config)
+    return {"messages": [model.invoke(messages)]}
+
+
+async def acall_model(state: AgentState, config: RunnableConfig):
+    """Async agent node, used by ainvoke/astream"""
+    model, messages = _prepare_model_call(state, config)
+    return {"messages": [await model.ainvoke(messages)]}
 
 
-def create_tools(tavily_api_key: Optional[str] = None, openai_api_key: Optional[str] = None):
-    """Create all research tools"""
+def create_tools(tavily_api_key: Optional[str] = None, openai_api_key: Optional[str] = None,
+                 model: Optional[ChatOpenAI] = None):
+    """Create all research tools. model, if given, is reused by query_enhancer."""
     tools = []
+    if model is None and openai_api_key:
+        model = create_model(openai_api_key)
     
     # Query Enhancement Tool - MUST BE USED FIRST
     @tool
     def query_enhancer(original_query: str) -> str:
         """Enhance the user's query to be more detailed and suitable for clinical/legal healthcare compliance analysis"""
-        if not openai_api_key:
+        if model is None:
             return f"Enhanced query: {original_query} (API key unavailable for enhancement)"
         
         try:
-            enhancement_model = create_model(openai_api_key)
-            
             enhancement_prompt = f"""You are a query enhancement specialist for healthcare compliance research. 
             
 Your task is to transform a user's basic question into a comprehensive, detailed query suitable for a clinical/legal healthcare compliance analyst.
@@ -161,7 +186,7 @@ Transform this into a detailed research query that:
 
 Return ONLY the enhanced query, nothing else. Make it comprehensive but focused."""
 
-            response = enhancement_model.invoke([HumanMessage(content=enhancement_prompt)])
+            response = model.invoke([HumanMessage(content=enhancement_prompt)])
             enhanced_query = response.content.strip()
             
             return f"Enhanced research query: {enhanced_query}"
@@ -194,7 +219,9 @@ Return ONLY the enhanced query, nothing else. Make it comprehensive but focused.
     def pubmed_search(query: str) -> str:
         """Search PubMed for medical and scientific research papers"""
         try:
-            base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+            # esearch and efetch go to the same host over the shared keep-alive session
+            session = get_session()
+            base_url = PUBMED_BASE_URL
             search_url = f"{base_url}esearch.fcgi"
             
             params = {
@@ -204,7 +231,8 @@ Return ONLY the enhanced query, nothing else. Make it comprehensive but focused.
                 "retmode": "json"
             }
             
-            response = requests.get(search_url, params=params)
+            response = session.get(search_url, params=params)
+            response.raise_for_status()
             search_results = response.json()
             
             if "esearchresult" in search_results and "idlist" in search_results["esearchresult"]:
@@ -219,7 +247,8 @@ Return ONLY the enhanced query, nothing else. Make it comprehensive but focused.
                         "retmode": "xml"
                     }
                     
-                    fetch_response = requests.get(fetch_url, params=fetch_params)
+                    fetch_response = session.get(fetch_url, params=fetch_params)
+                    fetch_response.raise_for_status()
                     return f"Found {len(ids)} PubMed articles for '{query}'. XML content: {fetch_response.text[:1000]}..."
                 else:
                     return f"No PubMed articles found for '{query}'"
@@ -242,16 +271,19 @@ Return ONLY the enhanced query, nothing else. Make it comprehensive but focused.
     def pdf_parser(url: str) -> str:
         """Parse PDF document from URL without downloading the file"""
         try:
-            # Download PDF content
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-            
-            # Check if content is PDF
-            if 'application/pdf' not in response.headers.get('content-type', ''):
-                return f"Error: URL does not point to a PDF file"
+            # Download PDF content; the context manager returns the connection to the
+            # pool even when the body is never read (e.g. not a PDF)
+            with get_session().get(url, stream=True) as response:
+                response.raise_for_status()
+                
+                # Check if content is PDF
+                if 'application/pdf' not in response.headers.get('content-type', ''):
+                    return f"Error: URL does not point to a PDF file"
+                
+                content = response.content
             
             # Parse PDF using PyMuPDF
-            pdf_stream = io.BytesIO(response.content)
+            pdf_stream = io.BytesIO(content)
             pdf_document = fitz.open(stream=pdf_stream, filetype="pdf")
             
             text_content = ""
@@ -275,48 +307,221 @@ Return ONLY the enhanced query, nothing else. Make it comprehensive but focused.
     return tools
 
 
-def track_tool_usage(state: AgentState):
+class ResearchToolset:
+    """The tools and models for one pair of API keys"""
+
+    def __init__(self, openai_api_key: str, tavily_api_key: Optional[str] = None):
+        self.model = create_model(openai_api_key)
+        self.tools = create_tools(tavily_api_key, openai_api_key, model=self.model)
+        self.tools_by_name = {research_tool.name: research_tool for research_tool in self.tools}
+        self.tool_model = self.model.bind_tools(self.tools)
+
+
+_toolsets: "OrderedDict[str, ResearchToolset]" = OrderedDict()
+_toolsets_lock = threading.Lock()
+
+
+def get_toolset(openai_api_key: str, tavily_api_key: Optional[str] = None) -> ResearchToolset:
+    """Return the cached toolset for these keys, building it on first use"""
+    # Keyed by a digest so the cache does not hold the keys themselves as dict keys
+    cache_key = hashlib.sha256(f"{openai_api_key}\0{tavily_api_key or ''}".encode("utf-8")).hexdigest()
+    with _toolsets_lock:
+        toolset = _toolsets.get(cache_key)
+        if toolset is not None:
+            _toolsets.move_to_end(cache_key)
+            return toolset
+    
+    # Built outside the lock so a slow build does not block other keys
+    toolset = ResearchToolset(openai_api_key, tavily_api_key)
+    with _toolsets_lock:
+        toolset = _toolsets.setdefault(cache_key, toolset)
+        _toolsets.move_to_end(cache_key)
+        while len(_toolsets) > RESEARCH_TOOLSET_CACHE_SIZE:
+            _toolsets.popitem(last=False)
+    return toolset
+
+
+def toolset_from_config(config: RunnableConfig) -> ResearchToolset:
+    """Credentials are passed per invocation in config["configurable"], never stored in the graph state"""
+    configurable = (config or {}).get("configurable", {})
+    api_key = configurable.get("openai_api_key")
+    if not api_key:
+        raise ValueError("OpenAI API key not found in config")
+    return get_toolset(api_key, configurable.get("tavily_api_key"))
+
+
+_tool_executor: Optional[ThreadPoolExecutor] = None
+_tool_executor_lock = threading.Lock()
+# The Python REPL captures output by swapping the process-wide sys.stdout, so
+# its calls must not overlap with each other; they run one at a time
+SERIAL_TOOLS = {"code_interpreter"}
+_serial_tool_lock = threading.Lock()
+
+
+def _get_tool_executor() -> ThreadPoolExecutor:
+    # Shared by all runs so concurrent research requests together stay within RESEARCH_TOOL_WORKERS threads
+    global _tool_executor
+    with _tool_executor_lock:
+        if _tool_executor is None:
+            _tool_executor = ThreadPoolExecutor(max_workers=RESEARCH_TOOL_WORKERS, thread_name_prefix="research-tool")
+    return _tool_executor
+
+
+def tool_timeout(tool_name: str) -> float:
+    return TOOL_TIMEOUTS.get(tool_name, RESEARCH_TOOL_TIMEOUT_SECONDS)
+
+
+def _tool_error(tool_call: dict, content: str) -> ToolMessage:
+    return ToolMessage(content=content, name=tool_call["name"], tool_call_id=tool_call["id"], status="error")
+
+
+def _run_tool_call(toolset: ResearchToolset, tool_call: dict, config: RunnableConfig) -> ToolMessage:
+    research_tool = toolset.tools_by_name.get(tool_call["name"])
+    if research_tool is None:
+        return _tool_error(
+            tool_call, f"Error: {tool_call['name']} is not a valid tool, try one of [{', '.join(toolset.tools_by_name)}]."
+        )
+    cache = get_tool_cache()
+    if cache is not None:
+        cached = cache.get(tool_call["name"], tool_call["args"])
+        if cached is not None:
+            # Marked so the research step can report the hit
+            return ToolMessage(
+                content=cached, name=tool_call["name"], tool_call_id=tool_call["id"],
+                response_metadata={"cached": True},
+            )
+    try:
+        if tool_call["name"] in SERIAL_TOOLS:
+            with _serial_tool_lock:
+                message = research_tool.invoke({**tool_call, "type": "tool_call"}, config)
+        else:
+            message = research_tool.invoke({**tool_call, "type": "tool_call"}, config)
+    except Exception as e:
+        return _tool_error(tool_call, f"Error: {str(e)}")
+    
+    # Failures the tools return as results are rejected by the cache itself
+    if cache is not None and message.status != "error" and isinstance(message.content, str):
+        cache.put(tool_call["name"], tool_call["args"], message.content)
+    return message
+
+
+def run_tool_calls(toolset: ResearchToolset, tool_calls: List[dict], config: RunnableConfig) -> List[ToolMessage]:
+    """
+    Run one model turn's tool calls concurrently and return their ToolMessages in
+    call order, so a turn takes about as long as its slowest call. A call that
+    outlives its tool's timeout is reported as an error result.
+    """
+    executor = _get_tool_executor()
+    started = time.monotonic()
+    futures = [executor.submit(_run_tool_call, toolset, tool_call, config) for tool_call in tool_calls]
+    results = []
+    for tool_call, future in zip(tool_calls, futures):
+        timeout = tool_timeout(tool_call["name"])
+        try:
+            results.append(future.result(timeout=max(0.0, started + timeout - time.monotonic())))
+        except FuturesTimeoutError:
+            # A running thread cannot be interrupted: it finishes in the background and its result is dropped
+            future.cancel()
+            results.append(_timeout_error(tool_call, timeout))
+    return results
+
+
+async def arun_tool_calls(
+    toolset: ResearchToolset,
+    tool_calls: List[dict],
+    config: RunnableConfig,
+    on_result: Optional[Callable[[int, ToolMessage], None]] = None,
+) -> List[ToolMessage]:
+    """
+    run_tool_calls for the event loop: awaits the same thread pool instead of blocking on it.
+    on_result(index, message) is called as each call finishes, in completion order.
+    """
+    loop = asyncio.get_running_loop()
+    executor = _get_tool_executor()
+
+    async def run_one(index: int, tool_call: dict) -> ToolMessage:
+        timeout = tool_timeout(tool_call["name"])
+        try:
+            message = await asyncio.wait_for(
+                loop.run_in_executor(executor, _run_tool_call, toolset, tool_call, config), timeout
+            )
+        except asyncio.TimeoutError:
+            message = _timeout_error(tool_call, timeout)
+        if on_result is not None:
+            on_result(index, message)
+        return message
+
+    return list(await asyncio.gather(*(run_one(index, tool_call) for index, tool_call in enumerate(tool_calls))))
+
+
+def _timeout_error(tool_call: dict, timeout: float) -> ToolMessage:
+    return _tool_error(tool_call, f"Error: {tool_call['name']} timed out after {timeout:g} seconds")
+
+
+def track_tool_usage(state: AgentState, config: RunnableConfig):
     """Custom tool node that tracks research steps"""
-    messages = state["messages"]
-    research_steps = state.get("research_steps", [])
-    step_counter = state.get("step_counter", 0)
+    last_message = state["messages"][-1]
     
-    last_message = messages[-1]
+    if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
+        # Execute tools concurrently; results are in the same order as the calls
+        tool_messages = run_tool_calls(toolset_from_config(config), last_message.tool_calls, config)
+        return _record_research_steps(state, last_message.tool_calls, tool_messages)
+    
+    return state
+
+
+async def atrack_tool_usage(state: AgentState, config: RunnableConfig):
+    """
+    Async tool node, used by ainvoke/astream. Each step is also written to the "custom"
+    stream as soon as its tool call finishes, so astream_research_agent can send it
+    before the slower calls of the same turn are done.
+    """
+    last_message = state["messages"][-1]
     
     if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-        # Create tools
-        tools = create_tools(state.get("tavily_api_key"), state.get("openai_api_key"))
-        tool_node = ToolNode(tools)
-        
-        # Execute tools
-        result = tool_node.invoke(state)
-        
-        # Copy existing research_steps and step_counter to result
-        result["research_steps"] = research_steps.copy()
-        result["step_counter"] = step_counter
-        
-        # Track each tool call
-        for i, tool_call in enumerate(last_message.tool_calls):
-            result["step_counter"] += 1
-            
-            # Find the corresponding tool result
-            tool_result = ""
-            if result["messages"] and len(result["messages"]) > i:
-                tool_result = result["messages"][i].content
-            
-            step = {
-                "step_number": result["step_counter"],
-                "tool_name": tool_call["name"],
-                "tool_input": str(tool_call["args"]),
-                "tool_output": tool_result[:500] + "..." if len(tool_result) > 500 else tool_result,
-                "timestamp": datetime.datetime.now().isoformat()
-            }
-            result["research_steps"].append(step)
-        
-        return result
+        tool_calls = last_message.tool_calls
+        step_counter = state.get("step_counter", 0)
+        steps: List[Optional[ResearchStep]] = [None] * len(tool_calls)
+        write = get_stream_writer()
+
+        def on_result(index: int, message: ToolMessage) -> None:
+            steps[index] = _research_step(step_counter + index + 1, tool_calls[index], message)
+            write({"research_step": steps[index]})
+
+        tool_messages = await arun_tool_calls(toolset_from_config(config), tool_calls, config, on_result)
+        return _record_research_steps(state, tool_calls, tool_messages, steps)
     
     return state
 
+
+def _research_step(step_number: int, tool_call: dict, message: Optional[ToolMessage]) -> ResearchStep:
+    tool_result = message.content if message is not None else ""
+    return {
+        "step_number": step_number,
+        "tool_name": tool_call["name"],
+        "tool_input": str(tool_call["args"]),
+        "tool_output": tool_result[:500] + "..." if len(tool_result) > 500 else tool_result,
+        "timestamp": datetime.datetime.now().isoformat(),
+        "cached": bool(message is not None and message.response_metadata.get("cached")),
+    }
+
+
+def _record_research_steps(state: AgentState, tool_calls: List[dict], tool_messages: List[ToolMessage],
+                           steps: Optional[List[ResearchStep]] = None):
+    """Append one ResearchStep per tool call (numbered in call order) to the state update"""
+    step_counter = state.get("step_counter", 0)
+    if steps is None:
+        steps = [
+            _research_step(step_counter + i + 1, tool_call, tool_messages[i] if i < len(tool_messages) else None)
+            for i, tool_call in enumerate(tool_calls)
+        ]
+    return {
+        "messages": tool_messages,
+        "research_steps": state.get("research_steps", []) + steps,
+        "step_counter": step_counter + len(tool_calls),
+    }
+
+
 def should_continue(state: AgentState):
     """Determine if we should continue to tools or end"""
     messages = state["messages"]
@@ -333,15 +538,15 @@ def should_continue(state: AgentState):
         return "end"
 
 
-def create_research_graph(openai_api_key: str, tavily_api_key: Optional[str] = None):
-    """Create the research agent graph"""
+def create_research_graph():
+    """Create the research agent graph. It holds no credentials; see get_research_graph."""
     
     # Create the graph
     workflow = StateGraph(AgentState)
     
-    # Add nodes
-    workflow.add_node("agent", call_model)
-    workflow.add_node("action", track_tool_usage)
+    # Add nodes; invoke runs the sync functions, ainvoke/astream the async ones
+    workflow.add_node("agent", RunnableLambda(call_model, afunc=acall_model, name="agent"))
+    workflow.add_node("action", RunnableLambda(track_tool_usage, afunc=atrack_tool_usage, name="action"))
     
     # Set entry point
     workflow.set_entry_point("agent")
@@ -365,9 +570,22 @@ def create_research_graph(openai_api_key: str, tavily_api_key: Optional[str] = N
     return app
 
 
-def run_research_agent(query: str, openai_api_key: str, tavily_api_key: Optional[str] = None, conversation_history: Optional[List[Dict[str, str]]] = None):
-    """Run the research agent with a query"""
-    
+_research_graph = None
+
+
+def get_research_graph():
+    """The compiled graph, built once per process and shared by all runs"""
+    global _research_graph
+    if _research_graph is None:
+        _research_graph = create_research_graph()
+    return _research_graph
+
+
+def research_config(openai_api_key: str, tavily_api_key: Optional[str] = None) -> RunnableConfig:
+    return {"configurable": {"openai_api_key": openai_api_key, "tavily_api_key": tavily_api_key}}
+
+
+def _initial_state(query: str, openai_api_key: str, conversation_history: Optional[List[Dict[str, str]]] = None):
     # Validate inputs
     if not query or query.strip() == "":
         raise ValueError("Query cannot be empty")
@@ -375,9 +593,6 @@ def run_research_agent(query: str, openai_api_key: str, tavily_api_key: Optional
     if not openai_api_key or openai_api_key.strip() == "":
         raise ValueError("OpenAI API key is required and cannot be empty")
     
-    # Create and run the graph
-    app = create_research_graph(openai_api_key, tavily_api_key)
-    
     # Convert conversation history to LangChain messages
     messages = []
     if conversation_history:
@@ -390,18 +605,14 @@ def run_research_agent(query: str, openai_api_key: str, tavily_api_key: Optional
     # Add the current query
     messages.append(HumanMessage(content=query))
     
-    # Initialize state
-    initial_state = {
+    return {
         "messages": messages,
-        "openai_api_key": openai_api_key,
-        "tavily_api_key": tavily_api_key,
         "research_steps": [],
         "step_counter": 0
     }
-    
-    # Run the agent
-    result = app.invoke(initial_state)
-    
+
+
+def _research_result(result) -> Dict[str, Any]:
     # Extract final answer and research steps
     final_answer = result["messages"][-1].content if result["messages"] else "No response generated"
     research_steps = result.get("research_steps", [])
@@ -412,5 +623,59 @@ def run_research_agent(query: str, openai_api_key: str, tavily_api_key: Optional
     }
 
 
-
-
+def run_research_agent(query: str, openai_api_key: str, tavily_api_key: Optional[str] = None, conversation_history: Optional[List[Dict[str, str]]] = None):
+    """Run the research agent with a query"""
+    initial_state = _initial_state(query, openai_api_key, conversation_history)
+    
+    # Run the agent; the keys select the cached toolset for this run
+    result = get_research_graph().invoke(initial_state, config=research_config(openai_api_key, tavily_api_key))
+    return _research_result(result)
+
+
+async def arun_research_agent(query: str, openai_api_key: str, tavily_api_key: Optional[str] = None, conversation_history: Optional[List[Dict[str, str]]] = None):
+    """run_research_agent without blocking the event loop"""
+    initial_state = _initial_state(query, openai_api_key, conversation_history)
+    result = await get_research_graph().ainvoke(initial_state, config=research_config(openai_api_key, tavily_api_key))
+    return _research_result(result)
+
+
+async def astream_research_agent(
+    query: str,
+    openai_api_key: str,
+    tavily_api_key: Optional[str] = None,
+    conversation_history: Optional[List[Dict[str, str]]] = None,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Run the research agent and yield ("step", research_step) for each tool call as
+    soon as that call finishes, then ("done", {"final_answer", "research_steps"}).
+    Calls of one turn run concurrently, so their steps can arrive out of step_number
+    order; the final research_steps are in order. Closing the iterator early cancels the run.
+    """
+    initial_state = _initial_state(query, openai_api_key, conversation_history)
+    research_steps: List[ResearchStep] = []
+    streamed = set()  # step numbers already yielded
+    final_answer = "No response generated"
+    
+    async for mode, chunk in get_research_graph().astream(
+        initial_state, config=research_config(openai_api_key, tavily_api_key), stream_mode=["updates", "custom"]
+    ):
+        if mode == "custom":
+            step = chunk.get("research_step") if isinstance(chunk, dict) else None
+            if step is not None:
+                streamed.add(step["step_number"])
+                yield "step", step
+            continue
+        for node, node_update in chunk.items():
+            if not node_update:
+                continue
+            if node == "agent" and node_update.get("messages"):
+                final_answer = node_update["messages"][-1].content
+            elif node == "action":
+                # The action node returns the whole step list; any step not streamed yet is sent now
+                research_steps = node_update.get("research_steps", research_steps)
+                for step in research_steps:
+                    if step["step_number"] not in streamed:
+                        streamed.add(step["step_number"])
+                        yield "step", step
+    
+    yield "done", {"final_answer": final_answer, "research_steps": research_steps}
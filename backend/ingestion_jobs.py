@@ -0,0 +1,278 @@
+"""
+Background PDF ingestion jobs.
+
+/api/upload-pdf only streams the file to disk and enqueues an IngestionJob,
+then returns its id. A backend runs the jobs (extraction, splitting,
+embedding) and /api/ingestion-jobs/{job_id} reports their progress.
+
+The default backend is an in-process pool of INGESTION_WORKERS asyncio worker
+tasks, so the number of concurrent ingestions is tuned independently of the
+web workers that serve requests. Other backends (e.g. an external task queue)
+subclass IngestionBackend and are registered in BACKENDS.
+
+A job runs in the worker process that accepted the upload, but its state is
+written to a SQLite file (INGESTION_JOB_DB) shared by the worker processes of
+one host, so a status poll answered by another gunicorn worker still finds it.
+Jobs of a worker that dies mid-ingestion stay in their last stage.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Type
+
+INGESTION_BACKEND = os.getenv("INGESTION_BACKEND", "inprocess")
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+# Jobs waiting beyond this are rejected, so a burst of uploads cannot pile up unbounded temp files
+INGESTION_MAX_QUEUED = int(os.getenv("INGESTION_MAX_QUEUED", "20"))
+# Finished jobs kept for status polling; the oldest are forgotten first
+INGESTION_JOB_RETENTION = int(os.getenv("INGESTION_JOB_RETENTION", "200"))
+# Job state shared by the worker processes; set to an empty string to keep it in process memory only
+INGESTION_JOB_DB = os.getenv("INGESTION_JOB_DB", "ingestion_jobs.db")
+# Progress counters are written to the job store at most this often; stage changes always are
+INGESTION_PROGRESS_SAVE_SECONDS = float(os.getenv("INGESTION_PROGRESS_SAVE_SECONDS", "0.5"))
+
+
+class IngestionQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at INGESTION_MAX_QUEUED"""
+
+
+class IngestionJobStore:
+    """
+    Job states as JSON rows in a SQLite file, so every worker process on the host
+    can answer a status poll. Finished jobs beyond retention are deleted oldest first.
+    """
+
+    def __init__(self, path: str = INGESTION_JOB_DB, retention: int = INGESTION_JOB_RETENTION):
+        self.path = path
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    finished_at REAL
+                )
+                """
+            )
+
+    def save(self, state: Dict[str, Any]) -> None:
+        with self._lock:
+            with self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO ingestion_jobs (job_id, state, finished_at) VALUES (?, ?, ?)",
+                    (state["job_id"], json.dumps(state), state["finished_at"]),
+                )
+                if state["finished_at"] is not None:
+                    self._connection.execute(
+                        """
+                        DELETE FROM ingestion_jobs WHERE job_id IN (
+                            SELECT job_id FROM ingestion_jobs WHERE finished_at IS NOT NULL
+                            ORDER BY finished_at DESC LIMIT -1 OFFSET ?
+                        )
+                        """,
+                        (self.retention,),
+                    )
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT state FROM ingestion_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class IngestionJob:
+    """
+    State and progress of one upload. Stages run queued -> extracting -> splitting
+    -> embedding -> completed, or end in failed with error set. Changes are written
+    through to store, if given.
+    """
+
+    def __init__(self, filename: str, file_path: str, file_size: int,
+                 store: Optional[IngestionJobStore] = None):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.file_path = file_path
+        self.file_size = file_size
+        self.status = "queued"
+        self.pages_extracted = 0
+        self.pages_total: Optional[int] = None
+        self.chunks_embedded = 0
+        self.chunks_total: Optional[int] = None
+        self.error: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.store = store
+        self._saved_at = 0.0
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def save(self, force: bool = True) -> None:
+        if self.store is None:
+            return
+        now = time.monotonic()
+        if force or now - self._saved_at >= INGESTION_PROGRESS_SAVE_SECONDS:
+            self._saved_at = now
+            self.store.save(self.to_dict())
+
+    def set_stage(self, stage: str) -> None:
+        self.status = stage
+        self.save()
+
+    def report_pages(self, done: int, total: int) -> None:
+        # Called from the extraction thread; plain attribute writes are safe under the GIL
+        self.pages_extracted = done
+        self.pages_total = total
+        self.save(force=done == total)
+
+    def report_chunks(self, done: int, total: int) -> None:
+        self.chunks_embedded = done
+        self.chunks_total = total
+        self.save(force=done == total)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "pages_extracted": self.pages_extracted,
+            "pages_total": self.pages_total,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_total": self.chunks_total,
+            "error": self.error,
+            "result": self.result,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+JobHandler = Callable[[IngestionJob], Awaitable[Dict[str, Any]]]
+
+
+class IngestionBackend:
+    """Runs submitted jobs. Subclasses decide where and how many run at once."""
+
+    async def submit(self, job: IngestionJob, run: Callable[[IngestionJob], Awaitable[None]]) -> None:
+        raise NotImplementedError
+
+    async def stop(self) -> None:
+        pass
+
+
+class InProcessBackend(IngestionBackend):
+    """A bounded asyncio queue drained by a fixed number of worker tasks on the server's event loop."""
+
+    def __init__(self, workers: int = INGESTION_WORKERS, max_queued: int = INGESTION_MAX_QUEUED):
+        self.workers = workers
+        self.max_queued = max_queued
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    def _start(self) -> None:
+        # Started lazily so the queue binds to the running event loop
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _worker(self) -> None:
+        while True:
+            job, run = await self._queue.get()
+            try:
+                await run(job)
+            finally:
+                self._queue.task_done()
+
+    async def submit(self, job: IngestionJob, run: Callable[[IngestionJob], Awaitable[None]]) -> None:
+        if self._queue is None:
+            self._start()
+        try:
+            self._queue.put_nowait((job, run))
+        except asyncio.QueueFull:
+            raise IngestionQueueFull(f"Ingestion queue is full ({self.max_queued} jobs waiting)")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+
+BACKENDS: Dict[str, Type[IngestionBackend]] = {
+    "inprocess": InProcessBackend,
+}
+
+
+def create_backend(name: str = INGESTION_BACKEND) -> IngestionBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown ingestion backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+class IngestionJobManager:
+    """Tracks jobs and hands them to the backend; handler does the actual ingestion."""
+
+    def __init__(self, handler: JobHandler, backend: Optional[IngestionBackend] = None,
+                 retention: int = INGESTION_JOB_RETENTION, store: Optional[IngestionJobStore] = None):
+        self.handler = handler
+        self.backend = backend or create_backend()
+        self.retention = retention
+        self.store = store if store is not None else (
+            IngestionJobStore(INGESTION_JOB_DB, retention) if INGESTION_JOB_DB else None
+        )
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+
+    async def submit(self, filename: str, file_path: str, file_size: int) -> IngestionJob:
+        job = IngestionJob(filename, file_path, file_size, store=self.store)
+        await self.backend.submit(job, self._run)
+        self._jobs[job.id] = job
+        # Written before the upload returns, so the first poll finds it in any worker
+        job.save()
+        self._forget_finished()
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        """A job accepted by this process"""
+        return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The state of a job accepted by any worker process sharing the job store"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        return self.store.load(job_id) if self.store is not None else None
+
+    async def _run(self, job: IngestionJob) -> None:
+        try:
+            job.result = await self.handler(job)
+            job.status = "completed"
+        except Exception as e:
+            print(f"Ingestion job {job.id} ({job.filename}) failed: {str(e)}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            job.save()
+
+    def _forget_finished(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.is_finished]
+        for job_id in finished[: max(0, len(finished) - self.retention)]:
+            del self._jobs[job_id]
+
+    async def stop(self) -> None:
+        await self.backend.stop()
@@ -0,0 +1,175 @@
+"""
+Load test for /api/chat.
+
+Fires concurrent chat requests at a running backend and, at the same time,
+probes GET / to show whether the event loop stays responsive while
+completions are in flight.
+
+To run offline, start the bundled stub OpenAI server and point the backend
+at it (the OpenAI SDK honours OPENAI_BASE_URL):
+
+    python load_test_chat.py stub --port 9100 --delay 2.0
+    OPENAI_BASE_URL=http://localhost:9100/v1 python main.py
+    python load_test_chat.py run --url http://localhost:8000 --requests 40 --concurrency 20
+
+For an offline database use SQLite (DATABASE_URL=sqlite:///./loadtest.db);
+DB_POOL_SIZE / DB_MAX_OVERFLOW apply to it as well, so pool sizing can be
+checked against the DB pool line of the report.
+
+With a blocking chat endpoint the total wall time grows with
+requests x delay and the probe latency spikes to the completion delay;
+with the async endpoint both stay close to a single delay.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_load(url: str, api_key: str, total: int, concurrency: int, message: str):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+    probe_latencies = []
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=url, timeout=600) as client:
+
+        async def one_chat():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(
+                    "/api/chat", json={"message": message, "api_key": api_key}
+                )
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/")
+                probe_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.1)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(one_chat() for _ in range(total)))
+        wall = time.perf_counter() - start
+        done.set()
+        await probe_task
+        pool_response = await client.get("/api/db-pool-stats")
+
+    print(f"Requests: {total} (concurrency {concurrency}), errors: {errors}")
+    print(f"Wall time: {wall:.2f} s, throughput: {total / wall:.2f} req/s")
+    print(
+        f"Chat latency  p50={statistics.median(latencies):.2f} s  "
+        f"p95={percentile(latencies, 95):.2f} s  max={max(latencies):.2f} s"
+    )
+    print(
+        f"Probe latency p50={statistics.median(probe_latencies) * 1000:.1f} ms  "
+        f"p95={percentile(probe_latencies, 95) * 1000:.1f} ms  "
+        f"max={max(probe_latencies) * 1000:.1f} ms"
+    )
+    if pool_response.status_code == 200:
+        # Stats come from whichever worker answered; run the backend with one worker for exact numbers
+        pool = pool_response.json()
+        print(
+            f"DB pool      checked_out={pool.get('checked_out')} overflow={pool.get('overflow')} "
+            f"checkouts={pool['checkouts']} timeouts={pool['timeouts']} "
+            f"wait avg={pool['wait_ms_avg']:.2f} ms p95={pool['wait_ms_p95']:.2f} ms max={pool['wait_ms_max']:.2f} ms"
+        )
+
+
+def serve_stub(port: int, delay: float):
+    """Minimal OpenAI-compatible server: fixed-delay (optionally streamed) chat completions and embeddings."""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import StreamingResponse
+    import json
+    import uvicorn
+
+    stub = FastAPI()
+
+    async def stream_chunks():
+        words = "Stub response streamed word by word.".split()
+        for word in words:
+            await asyncio.sleep(delay / len(words))
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": "stub",
+                "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @stub.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        if body.get("stream"):
+            return StreamingResponse(stream_chunks(), media_type="text/event-stream")
+        await asyncio.sleep(delay)
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "stub",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "Stub response."},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+
+    @stub.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        return {
+            "object": "list",
+            "model": "stub",
+            "data": [
+                {"object": "embedding", "index": i, "embedding": [float(len(text)), 1.0, 0.0]}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": 1, "total_tokens": 1},
+        }
+
+    uvicorn.run(stub, host="127.0.0.1", port=port, log_level="warning")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the load test against a backend")
+    run.add_argument("--url", default="http://localhost:8000")
+    run.add_argument("--api-key", default="sk-load-test")
+    run.add_argument("--requests", type=int, default=40)
+    run.add_argument("--concurrency", type=int, default=20)
+    run.add_argument("--message", default="Give me a one-line market entry tip.")
+
+    stub = commands.add_parser("stub", help="serve a stub OpenAI API")
+    stub.add_argument("--port", type=int, default=9100)
+    stub.add_argument("--delay", type=float, default=2.0)
+
+    args = parser.parse_args()
+    if args.command == "stub":
+        serve_stub(args.port, args.delay)
+    else:
+        asyncio.run(run_load(args.url, args.api_key, args.requests, args.concurrency, args.message))
+
+
+if __name__ == "__main__":
+    main()
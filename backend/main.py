@@ -1,31 +1,55 @@
-from fastapi import FastAPI, HTTPException, Depends, File, UploadFile
+from fastapi import FastAPI, HTTPException, Depends, Request, BackgroundTasks, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session, selectinload
+from typing import Dict, List, Optional, Tuple
+from contextlib import asynccontextmanager
 import os
+import json
 from dotenv import load_dotenv
 
-from database import SessionLocal, engine, Base
+from database import SessionLocal, RUN_MIGRATIONS_ON_STARTUP, run_migrations, get_pool_stats
 from models import Conversation, Message
 from schemas import (
     ChatRequest, ChatResponse, ConversationResponse, MessageResponse,
-    PDFUploadResponse, PDFInfoResponse, DeletePDFRequest, DeletePDFResponse,
-    DeepResearchRequest, DeepResearchResponse, LinkedInPostRequest, LinkedInPostResponse,
+    ConversationSummaryResponse, ConversationPageResponse, MessagePageResponse,
+    IngestionJobResponse, PDFInfoResponse, DeletePDFRequest, DeletePDFResponse, CacheStatsResponse,
+    DBPoolStatsResponse,
+    DeepResearchRequest, DeepResearchResponse, ResearchStep, LinkedInPostRequest, LinkedInPostResponse,
     AgentLogsResponse, AgentLogEntry, WorkingDirectoryResponse, WorkingDirectoryFile,
     FileContentRequest, FileContentResponse
 )
 from openai_service import OpenAIService
-from rag_service import RAGService
+from chat_history import build_conversation_history, refresh_conversation_summary, older_than
+from rag_service import RAGService, PDFTooLargeError, InvalidUploadError
+from ingestion_jobs import IngestionJobManager, IngestionQueueFull
+from tool_cache import get_tool_cache
 
 load_dotenv()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Bring the database schema up to date (see migrations/)
+if RUN_MIGRATIONS_ON_STARTUP:
+    run_migrations()
 
 # Initialize RAG service
 rag_service = RAGService()
 
-app = FastAPI(title="Chatapp API", version="1.0.0")
+# Uploads are ingested in the background; see ingestion_jobs.py
+ingestion_jobs = IngestionJobManager(
+    lambda job: rag_service.ingest_pdf(job.file_path, job.filename, job.file_size, job=job)
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Stop taking queued ingestion jobs, then shut down the PDF extraction processes
+    await ingestion_jobs.stop()
+    await run_in_threadpool(rag_service.close)
+
+app = FastAPI(title="Chatapp API", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware
 import os
@@ -56,59 +80,93 @@ def get_db():
 def read_root():
     return {"message": "Chatapp API is running"}
 
+def start_chat_turn(db: Session, conversation_id: Optional[int], user_content: str) -> Tuple[int, List[Dict[str, str]]]:
+    """
+    Get or create the conversation, read its history and save the new user message
+    in one transaction, so the question is durable before the model is called.
+    Blocking DB work - call through run_in_threadpool from async endpoints.
+    """
+    # Get or create conversation
+    conversation = db.query(Conversation).filter(
+        Conversation.id == conversation_id
+    ).first() if conversation_id else None
+    
+    if conversation:
+        # Get conversation history BEFORE adding the new user message:
+        # the rolling summary plus only the newest messages that fit the token budget
+        conversation_history = build_conversation_history(db, conversation)
+    else:
+        # Flush instead of commit + refresh: the INSERT returns the id in the same round trip
+        conversation = Conversation()
+        db.add(conversation)
+        db.flush()
+        conversation_history = []
+    
+    # Read the id before committing: touching the expired instance afterwards would
+    # start a new transaction and hold a pooled connection for the whole LLM call
+    conversation_id = conversation.id
+    
+    # Save user message AFTER getting history, committed together with a new conversation
+    db.execute(insert(Message), [{
+        "conversation_id": conversation_id,
+        "role": "user",
+        "content": user_content,
+    }])
+    db.commit()
+    
+    return conversation_id, conversation_history
+
+def save_assistant_message(db: Session, conversation_id: int, content: str) -> None:
+    """
+    Persist the AI response. Blocking DB work - call through run_in_threadpool.
+    A bulk insert: no ORM instance to track and no RETURNING, just INSERT + COMMIT.
+    """
+    db.execute(insert(Message), [{
+        "conversation_id": conversation_id,
+        "role": "assistant",
+        "content": content,
+    }])
+    db.commit()
+
+async def get_pdf_context(request: ChatRequest) -> Optional[List[str]]:
+    """
+    Retrieve RAG context for a chat request without blocking the event loop
+    """
+    if request.search_all_pdfs or request.pdf_filenames:
+        return await rag_service.aget_library_context(
+            request.message,
+            k=3,
+            filenames=None if request.search_all_pdfs else request.pdf_filenames
+        )
+    if request.pdf_filename:
+        return await rag_service.aget_relevant_context(
+            request.pdf_filename, 
+            request.message, 
+            k=3
+        )
+    return None
+
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest, db: Session = Depends(get_db)):
+async def chat_endpoint(request: ChatRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """
-    Send a message to the AI and get a response (with optional RAG)
+    Send a message to the AI and get a response (with optional RAG).
+    DB work runs in the threadpool and OpenAI/embedding calls are awaited,
+    so a slow completion never blocks other requests on this worker.
     """
     try:
-        # Get or create conversation
-        conversation = db.query(Conversation).filter(
-            Conversation.id == request.conversation_id
-        ).first() if request.conversation_id else None
-        
-        if not conversation:
-            conversation = Conversation()
-            db.add(conversation)
-            db.commit()
-            db.refresh(conversation)
-        
-        # Get conversation history BEFORE adding the new user message
-        # This ensures we get all previous messages for context
-        existing_messages = db.query(Message).filter(
-            Message.conversation_id == conversation.id
-        ).order_by(Message.created_at).all()
-        
-        # Convert to OpenAI format
-        conversation_history = [
-            {"role": msg.role, "content": msg.content}
-            for msg in existing_messages
-        ]
-        
-        # Save user message AFTER getting history
-        user_message = Message(
-            conversation_id=conversation.id,
-            role="user",
-            content=request.message
+        conversation_id, conversation_history = await run_in_threadpool(
+            start_chat_turn, db, request.conversation_id, request.message
         )
-        db.add(user_message)
-        db.commit()
         
         # Process chat mode - ensure proper enum handling
         chat_mode_str = request.chat_mode.value if hasattr(request.chat_mode, 'value') else str(request.chat_mode) if request.chat_mode else "general"
         
         # Get PDF context if PDF is selected
-        pdf_context = None
-        if request.pdf_filename:
-            pdf_context = rag_service.get_relevant_context(
-                request.pdf_filename, 
-                request.message, 
-                k=3
-            )
+        pdf_context = await get_pdf_context(request)
         
         # Get AI response using appropriate mode (with optional PDF context)
         openai_service = OpenAIService(request.api_key)
-        ai_response = openai_service.get_expert_response(
+        ai_response = await openai_service.aget_expert_response(
             request.message, 
             conversation_history,
             pdf_context=pdf_context,
@@ -116,40 +174,145 @@ async def chat_endpoint(request: ChatRequest, db: Session = Depends(get_db)):
         )
         
         # Save AI response
-        ai_message = Message(
-            conversation_id=conversation.id,
-            role="assistant",
-            content=ai_response
-        )
-        db.add(ai_message)
-        db.commit()
+        await run_in_threadpool(save_assistant_message, db, conversation_id, ai_response)
+        
+        # Fold turns that left the history window into the summary after responding
+        background_tasks.add_task(refresh_conversation_summary, conversation_id, request.api_key)
         
         return ChatResponse(
-            conversation_id=conversation.id,
+            conversation_id=conversation_id,
             response=ai_response
         )
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/upload-pdf", response_model=PDFUploadResponse)
-async def upload_pdf(file: UploadFile = File(...)):
+def save_assistant_message_in_new_session(conversation_id: int, content: str) -> None:
     """
-    Upload and process a PDF file for RAG
+    Persist the AI response from a streaming generator, which outlives the request-scoped session
     """
+    db = SessionLocal()
     try:
-        # Validate file type
-        if not file.filename.lower().endswith('.pdf'):
-            raise HTTPException(status_code=400, detail="Only PDF files are allowed")
-        
-        # Process PDF using RAG service
-        result = await rag_service.process_pdf(file)
+        save_assistant_message(db, conversation_id, content)
+    finally:
+        db.close()
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest, http_request: Request, db: Session = Depends(get_db)):
+    """
+    Send a message and stream the AI response over Server-Sent Events.
+    Emits `start` (conversation id), one `token` event per delta, then `done`
+    once the assistant message is saved, or `error`. If the client disconnects
+    the upstream OpenAI stream is closed and nothing is persisted.
+    """
+    try:
+        conversation_id, conversation_history = await run_in_threadpool(
+            start_chat_turn, db, request.conversation_id, request.message
+        )
+        chat_mode_str = request.chat_mode.value if hasattr(request.chat_mode, 'value') else str(request.chat_mode) if request.chat_mode else "general"
+        pdf_context = await get_pdf_context(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    openai_service = OpenAIService(request.api_key)
+    
+    async def event_stream():
+        yield sse_event("start", {"conversation_id": conversation_id})
+        tokens = []
+        token_stream = openai_service.astream_expert_response(
+            request.message,
+            conversation_history,
+            pdf_context=pdf_context,
+            chat_mode=chat_mode_str
+        )
+        try:
+            async for token in token_stream:
+                if await http_request.is_disconnected():
+                    return
+                tokens.append(token)
+                yield sse_event("token", {"content": token})
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+            return
+        finally:
+            # Runs on completion, error, disconnect or cancellation - releases the upstream request
+            await token_stream.aclose()
+        
+        ai_response = "".join(tokens)
+        await run_in_threadpool(save_assistant_message_in_new_session, conversation_id, ai_response)
+        yield sse_event("done", {"conversation_id": conversation_id, "response": ai_response})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(refresh_conversation_summary, conversation_id, request.api_key)
+    )
+
+@app.post(
+    "/api/upload-pdf",
+    response_model=IngestionJobResponse,
+    status_code=202,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["file"],
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                    }
+                }
+            },
+        }
+    },
+)
+async def upload_pdf(request: Request):
+    """
+    Upload a PDF (multipart field "file") for RAG. The body is streamed straight to
+    disk and queued for ingestion; poll /api/ingestion-jobs/{job_id} until it is
+    completed or failed.
+    """
+    try:
+        content_length = request.headers.get("content-length", "")
+        filename, file_path, file_size = await rag_service.save_upload_stream(
+            request.stream(),
+            request.headers.get("content-type", ""),
+            int(content_length) if content_length.isdigit() else None,
+        )
+        try:
+            job = await ingestion_jobs.submit(filename, file_path, file_size)
+        except IngestionQueueFull:
+            os.unlink(file_path)
+            raise
         
-        return PDFUploadResponse(**result)
+        return IngestionJobResponse(**job.to_dict())
     
+    except HTTPException:
+        raise
+    except PDFTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except IngestionQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
 
+@app.get("/api/ingestion-jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_ingestion_job(job_id: str):
+    """
+    Get the status and per-stage progress of a PDF ingestion job
+    """
+    job = ingestion_jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return IngestionJobResponse(**job)
+
 @app.get("/api/pdfs", response_model=List[PDFInfoResponse])
 async def get_uploaded_pdfs():
     """
@@ -161,6 +324,24 @@ async def get_uploaded_pdfs():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/cache-stats", response_model=CacheStatsResponse)
+async def get_cache_stats():
+    """
+    Get hit rates for the embedding caches used by RAG retrieval and the deep research tool cache
+    """
+    tool_cache = get_tool_cache()
+    return CacheStatsResponse(
+        **rag_service.get_cache_stats(),
+        research_tools=tool_cache.stats() if tool_cache is not None else None
+    )
+
+@app.get("/api/db-pool-stats", response_model=DBPoolStatsResponse)
+async def get_db_pool_stats():
+    """
+    Get connection pool occupancy and checkout wait times for this worker
+    """
+    return DBPoolStatsResponse(**get_pool_stats())
+
 @app.delete("/api/pdfs", response_model=DeletePDFResponse)
 async def delete_pdf(request: DeletePDFRequest):
     """
@@ -181,49 +362,59 @@ async def delete_pdf(request: DeletePDFRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def research_conversation_history(request: DeepResearchRequest) -> Optional[List[Dict[str, str]]]:
+    # Convert conversation history to the format expected by the agent
+    if not request.conversation_history:
+        return None
+    return [
+        {"role": msg.role, "content": msg.content}
+        for msg in request.conversation_history
+    ]
+
+def research_error(e: Exception) -> HTTPException:
+    """Map a research agent failure to the HTTP error reported to the client"""
+    # Handle OpenAI API key errors specifically
+    error_message = str(e)
+    if "401" in error_message and "Incorrect API key" in error_message:
+        return HTTPException(
+            status_code=401, 
+            detail="Invalid OpenAI API key. Please check your API key and try again."
+        )
+    elif "401" in error_message:
+        return HTTPException(
+            status_code=401, 
+            detail="Authentication failed. Please check your API key."
+        )
+    else:
+        return HTTPException(status_code=500, detail=f"Deep research error: {error_message}")
+
+def validate_research_request(request: DeepResearchRequest) -> None:
+    if not request.message or request.message.strip() == "":
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+    
+    if not request.api_key or request.api_key.strip() == "":
+        raise HTTPException(status_code=400, detail="OpenAI API key is required")
+
 @app.post("/api/deep-research", response_model=DeepResearchResponse)
 async def deep_research_endpoint(request: DeepResearchRequest):
     """
-    Deep research endpoint using LangGraph agent with multiple tools
+    Deep research endpoint using LangGraph agent with multiple tools.
+    The graph runs asynchronously, so other requests are served while it researches.
     """
+    validate_research_request(request)
     try:
-        # Validate inputs
-        if not request.message or request.message.strip() == "":
-            raise HTTPException(status_code=400, detail="Message cannot be empty")
-        
-        if not request.api_key or request.api_key.strip() == "":
-            raise HTTPException(status_code=400, detail="OpenAI API key is required")
-        
-        from deepresearchagent import run_research_agent
-        
-        # Convert conversation history to the format expected by the agent
-        conversation_history = None
-        if request.conversation_history:
-            conversation_history = [
-                {"role": msg.role, "content": msg.content}
-                for msg in request.conversation_history
-            ]
+        from deepresearchagent import arun_research_agent
         
         # Run the research agent with tools and conversation history
-        result = run_research_agent(
+        result = await arun_research_agent(
             query=request.message,
             openai_api_key=request.api_key,
             tavily_api_key=request.tavily_api_key,
-            conversation_history=conversation_history
+            conversation_history=research_conversation_history(request)
         )
         
         # Convert research steps to the schema format
-        from schemas import ResearchStep
-        research_steps = [
-            ResearchStep(
-                step_number=step["step_number"],
-                tool_name=step["tool_name"],
-                tool_input=step["tool_input"],
-                tool_output=step["tool_output"],
-                timestamp=step["timestamp"]
-            )
-            for step in result["research_steps"]
-        ]
+        research_steps = [ResearchStep(**step) for step in result["research_steps"]]
         
         return DeepResearchResponse(
             final_answer=result["final_answer"],
@@ -231,20 +422,44 @@ async def deep_research_endpoint(request: DeepResearchRequest):
         )
         
     except Exception as e:
-        # Handle OpenAI API key errors specifically
-        error_message = str(e)
-        if "401" in error_message and "Incorrect API key" in error_message:
-            raise HTTPException(
-                status_code=401, 
-                detail="Invalid OpenAI API key. Please check your API key and try again."
-            )
-        elif "401" in error_message:
-            raise HTTPException(
-                status_code=401, 
-                detail="Authentication failed. Please check your API key."
-            )
-        else:
-            raise HTTPException(status_code=500, detail=f"Deep research error: {error_message}")
+        raise research_error(e)
+
+@app.post("/api/deep-research/stream")
+async def deep_research_stream_endpoint(request: DeepResearchRequest, http_request: Request):
+    """
+    Deep research over Server-Sent Events. Emits a `step` event with each
+    ResearchStep as soon as its tool call finishes (calls of one turn run
+    concurrently, so these can arrive out of step_number order), then `done`
+    with the final answer and all steps in order, or `error` with the status and detail /api/deep-research
+    would have returned. The run is cancelled if the client disconnects.
+    """
+    validate_research_request(request)
+    from deepresearchagent import astream_research_agent
+    
+    async def event_stream():
+        research = astream_research_agent(
+            query=request.message,
+            openai_api_key=request.api_key,
+            tavily_api_key=request.tavily_api_key,
+            conversation_history=research_conversation_history(request)
+        )
+        try:
+            async for event, data in research:
+                if await http_request.is_disconnected():
+                    return
+                yield sse_event(event, data)
+        except Exception as e:
+            error = research_error(e)
+            yield sse_event("error", {"status_code": error.status_code, "detail": error.detail})
+        finally:
+            # Stops the graph run on completion, error or disconnect
+            await research.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.post("/api/linkedin-writer", response_model=LinkedInPostResponse)
 async def linkedin_writer_endpoint(request: LinkedInPostRequest):
@@ -419,28 +634,106 @@ async def get_file_content(request: FileContentRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading file: {str(e)}")
 
-@app.get("/api/conversations", response_model=List[ConversationResponse])
-def get_conversations(db: Session = Depends(get_db)):
+MESSAGE_PREVIEW_LENGTH = 200
+
+def to_message_response(msg: Message) -> MessageResponse:
+    return MessageResponse(
+        id=msg.id,
+        role=msg.role,
+        content=msg.content,
+        created_at=msg.created_at
+    )
+
+@app.get("/api/conversations", response_model=ConversationPageResponse)
+def get_conversations(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[int] = None,
+    include_messages: bool = False,
+    db: Session = Depends(get_db)
+):
     """
-    Get all conversations
+    Get conversations newest first, one page at a time.
+    Each item is a lightweight summary (message count, last-message preview);
+    full messages are only loaded, in one extra query, with include_messages=true.
     """
-    conversations = db.query(Conversation).all()
-    return [
-        ConversationResponse(
+    query = db.query(Conversation)
+    if cursor is not None:
+        query = query.filter(Conversation.id < cursor)
+    if include_messages:
+        query = query.options(selectinload(Conversation.messages))
+    conversations = query.order_by(Conversation.id.desc()).limit(limit + 1).all()
+    
+    has_more = len(conversations) > limit
+    conversations = conversations[:limit]
+    ids = [conv.id for conv in conversations]
+    
+    # Message counts and last-message previews for the whole page in one query
+    summaries = {}
+    if ids:
+        stats = db.query(
+            Message.conversation_id.label("conversation_id"),
+            func.count(Message.id).label("message_count"),
+            func.max(Message.id).label("last_message_id")
+        ).filter(Message.conversation_id.in_(ids)).group_by(Message.conversation_id).subquery()
+        rows = db.query(
+            stats.c.conversation_id,
+            stats.c.message_count,
+            func.substr(Message.content, 1, MESSAGE_PREVIEW_LENGTH).label("preview"),
+            Message.role,
+            Message.created_at
+        ).join(Message, Message.id == stats.c.last_message_id).all()
+        summaries = {row.conversation_id: row for row in rows}
+    
+    items = []
+    for conv in conversations:
+        summary = summaries.get(conv.id)
+        items.append(ConversationSummaryResponse(
             id=conv.id,
             created_at=conv.created_at,
-            messages=[
-                MessageResponse(
-                    id=msg.id,
-                    role=msg.role,
-                    content=msg.content,
-                    created_at=msg.created_at
-                )
-                for msg in conv.messages
-            ]
-        )
-        for conv in conversations
-    ]
+            message_count=summary.message_count if summary else 0,
+            last_message_preview=summary.preview if summary else None,
+            last_message_role=summary.role if summary else None,
+            last_message_at=summary.created_at if summary else None,
+            messages=[to_message_response(msg) for msg in conv.messages] if include_messages else None
+        ))
+    
+    return ConversationPageResponse(
+        conversations=items,
+        next_cursor=ids[-1] if has_more else None
+    )
+
+@app.get("/api/conversations/{conversation_id}/messages", response_model=MessagePageResponse)
+def get_conversation_messages(
+    conversation_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get a conversation's messages one page at a time, newest page first.
+    Pass next_cursor back as `before` to walk towards older messages.
+    """
+    if not db.query(Conversation.id).filter(Conversation.id == conversation_id).first():
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    query = db.query(Message).filter(Message.conversation_id == conversation_id)
+    if before is not None:
+        cursor_message = db.query(Message).filter(
+            Message.id == before, Message.conversation_id == conversation_id
+        ).first()
+        if not cursor_message:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(older_than(cursor_message))
+    messages = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1).all()
+    
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    messages.reverse()
+    
+    return MessagePageResponse(
+        messages=[to_message_response(msg) for msg in messages],
+        next_cursor=messages[0].id if has_more else None
+    )
 
 @app.post("/api/conversations", response_model=ConversationResponse)
 def create_conversation(db: Session = Depends(get_db)):
@@ -0,0 +1,30 @@
+"""Rolling summary columns on conversations
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if context.is_offline_mode():
+        columns = set()
+    else:
+        columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("conversations")}
+    if "summary" not in columns:
+        op.add_column("conversations", sa.Column("summary", sa.Text(), nullable=True))
+    if "summary_through_message_id" not in columns:
+        op.add_column("conversations", sa.Column("summary_through_message_id", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("conversations") as batch_op:
+        batch_op.drop_column("summary_through_message_id")
+        batch_op.drop_column("summary")
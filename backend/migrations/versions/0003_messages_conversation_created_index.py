@@ -0,0 +1,39 @@
+"""Composite (conversation_id, created_at) index on messages
+
+Every chat turn and history page filters messages by conversation_id and
+orders by created_at; without this index that is a sequential scan plus a
+sort. On PostgreSQL the index is built CONCURRENTLY so writes to a large
+messages table are not blocked while it builds.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "ix_messages_conversation_id_created_at"
+
+
+def upgrade() -> None:
+    if not context.is_offline_mode():
+        indexes = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("messages")}
+        if INDEX_NAME in indexes:
+            return
+    with op.get_context().autocommit_block():
+        op.create_index(
+            INDEX_NAME,
+            "messages",
+            ["conversation_id", "created_at"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(INDEX_NAME, table_name="messages", postgresql_concurrently=True)
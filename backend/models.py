@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey  # type: ignore
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index  # type: ignore
 from sqlalchemy.orm import relationship  # type: ignore
 from sqlalchemy.sql import func  # type: ignore
 from database import Base
@@ -8,12 +8,19 @@ class Conversation(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     created_at = Column(DateTime, server_default=func.now())
+    # Rolling summary of turns that no longer fit the history window
+    summary = Column(Text, nullable=True)
+    summary_through_message_id = Column(Integer, nullable=True)  # newest message folded into summary
     
     # Relationship with messages
-    messages = relationship("Message", back_populates="conversation")
+    messages = relationship("Message", back_populates="conversation", order_by="Message.created_at")
 
 class Message(Base):
     __tablename__ = "messages"
+    # History reads filter by conversation and order by time (see migrations/versions/0003)
+    __table_args__ = (
+        Index("ix_messages_conversation_id_created_at", "conversation_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id"))
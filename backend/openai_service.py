@@ -1,38 +1,103 @@
 import openai  # type: ignore
-from typing import List, Dict, Optional
+import os
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, List, Dict, Optional
+
+# Building a client costs ~100 ms of SSL/httpx setup, so clients are kept per API key
+# and shared by every request with that key; the least recently used keys are dropped
+OPENAI_CLIENT_CACHE_SIZE = int(os.getenv("OPENAI_CLIENT_CACHE_SIZE", "64"))
+
+_async_clients: "OrderedDict[str, openai.AsyncOpenAI]" = OrderedDict()
+_sync_clients: "OrderedDict[str, openai.OpenAI]" = OrderedDict()
+_clients_lock = threading.Lock()
+
+
+def _cached_client(clients: OrderedDict, api_key: str, factory: Callable):
+    with _clients_lock:
+        client = clients.get(api_key)
+        if client is not None:
+            clients.move_to_end(api_key)
+            return client
+    # Built outside the lock; if two requests race, the first stored client wins
+    client = factory(api_key=api_key)
+    with _clients_lock:
+        client = clients.setdefault(api_key, client)
+        clients.move_to_end(api_key)
+        # Evicted clients are not closed: a request may still be using one
+        while len(clients) > OPENAI_CLIENT_CACHE_SIZE:
+            clients.popitem(last=False)
+    return client
+
 
 class OpenAIService:
+    model = "gpt-4.1"
+    max_tokens = 2500
+    temperature = 0.1
+    summary_model = "gpt-4.1-mini"
+    summary_max_tokens = 600
+    
     def __init__(self, api_key: str):
-        self.client = openai.OpenAI(api_key=api_key)
+        self.api_key = api_key
+        self.async_client = _cached_client(_async_clients, api_key, openai.AsyncOpenAI)
+    
+    @property
+    def client(self) -> openai.OpenAI:
+        # Only the sync get_expert_response needs it, so it is created on first use
+        return _cached_client(_sync_clients, self.api_key, openai.OpenAI)
         
-    def get_expert_response(self, user_message: str, conversation_history: Optional[List[Dict[str, str]]] = None, pdf_context: Optional[List[str]] = None, chat_mode: str = "general") -> str:
+    def _build_messages(self, user_message: str, conversation_history: Optional[List[Dict[str, str]]] = None, pdf_context: Optional[List[str]] = None, chat_mode: str = "general") -> List[Dict[str, str]]:
         """
-        Get a response from the AI using different system prompts based on chat mode
+        Build the system prompt, history and user message for a chat completion
         """
-
-        
         # Build the appropriate system prompt based on chat mode
         if chat_mode == "research_reviewer":
             system_prompt = self._get_research_reviewer_prompt(pdf_context)
         else:
             system_prompt = self._get_expert_consultant_prompt(pdf_context)
         
+        # Build messages array with conversation history
+        messages = [{"role": "system", "content": system_prompt}]
+        
+        # Add conversation history if provided
+        if conversation_history:
+            messages.extend(conversation_history)
+        
+        # Add current user message
+        messages.append({"role": "user", "content": user_message})
+        return messages
+        
+    def get_expert_response(self, user_message: str, conversation_history: Optional[List[Dict[str, str]]] = None, pdf_context: Optional[List[str]] = None, chat_mode: str = "general") -> str:
+        """
+        Get a response from the AI using different system prompts based on chat mode
+        """
+        messages = self._build_messages(user_message, conversation_history, pdf_context, chat_mode)
+        
         try:
-            # Build messages array with conversation history
-            messages = [{"role": "system", "content": system_prompt}]
-            
-            # Add conversation history if provided
-            if conversation_history:
-                messages.extend(conversation_history)
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature
+            )
             
-            # Add current user message
-            messages.append({"role": "user", "content": user_message})
+            return response.choices[0].message.content
             
-            response = self.client.chat.completions.create(
-                model="gpt-4.1",
+        except Exception as e:
+            raise Exception(f"OpenAI API error: {str(e)}")
+    
+    async def aget_expert_response(self, user_message: str, conversation_history: Optional[List[Dict[str, str]]] = None, pdf_context: Optional[List[str]] = None, chat_mode: str = "general") -> str:
+        """
+        Async variant of get_expert_response that does not block the event loop
+        """
+        messages = self._build_messages(user_message, conversation_history, pdf_context, chat_mode)
+        
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
                 messages=messages,
-                max_tokens=2500,
-                temperature=0.1
+                max_tokens=self.max_tokens,
+                temperature=self.temperature
             )
             
             return response.choices[0].message.content
@@ -40,6 +105,57 @@ class OpenAIService:
         except Exception as e:
             raise Exception(f"OpenAI API error: {str(e)}")
     
+    async def astream_expert_response(self, user_message: str, conversation_history: Optional[List[Dict[str, str]]] = None, pdf_context: Optional[List[str]] = None, chat_mode: str = "general") -> AsyncIterator[str]:
+        """
+        Stream response tokens as they arrive. Closing the generator early
+        (e.g. on client disconnect) closes the upstream HTTP response too.
+        """
+        messages = self._build_messages(user_message, conversation_history, pdf_context, chat_mode)
+        
+        try:
+            stream = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                stream=True
+            )
+        except Exception as e:
+            raise Exception(f"OpenAI API error: {str(e)}")
+        
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+    
+    async def asummarize_history(self, previous_summary: Optional[str], messages: List[Dict[str, str]]) -> str:
+        """
+        Fold older conversation turns into a compact rolling summary
+        """
+        transcript = "\n\n".join(f"{msg['role'].upper()}: {msg['content']}" for msg in messages)
+        prompt = f"""Update the running summary of a conversation between a user and an AI consultant.
+
+Existing summary (may be empty):
+{previous_summary or ""}
+
+New turns to fold in:
+{transcript}
+
+Return only the updated summary. Keep the user's goals, key facts, decisions, figures and open questions; drop pleasantries and repetition."""
+        
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=self.summary_model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=self.summary_max_tokens,
+                temperature=0
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            raise Exception(f"OpenAI API error: {str(e)}")
+    
     def _get_expert_consultant_prompt(self, pdf_context: Optional[List[str]] = None) -> str:
         """
         Get the expert consultant system prompt (original functionality)
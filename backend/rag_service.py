@@ -1,59 +1,360 @@
 import os
+import hashlib
+import shutil
 import tempfile
 import asyncio
-from typing import List, Optional, Dict, Any
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
 from fastapi import UploadFile
+from multipart.multipart import MultipartParser, parse_options_header
 import numpy as np
 
-from aimakerspace.text_utils import PDFLoader, CharacterTextSplitter
+from aimakerspace.text_utils import PDFLoader, CharacterTextSplitter, TokenTextSplitter
 from aimakerspace.openai_utils.embedding import EmbeddingModel
 from aimakerspace.vectordatabase import VectorDatabase
+from aimakerspace.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from ingestion_jobs import IngestionJob
+
+
+class LibrarySnapshot:
+    """
+    Every store stacked into one matrix, with each file's row range and the stores
+    themselves as they were when it was built. A search reads only its snapshot, so
+    an upload or delete that lands mid-search cannot change the data under it.
+    """
+
+    __slots__ = ("matrix", "ranges", "stores")
+
+    def __init__(self, matrix: np.ndarray, ranges: Dict[str, Tuple[int, int]], stores: Dict[str, VectorDatabase]):
+        self.matrix = matrix
+        self.ranges = ranges  # filename -> (start row, end row)
+        self.stores = stores
+
+
+class PDFTooLargeError(ValueError):
+    """Raised while streaming an upload that exceeds PDF_UPLOAD_MAX_BYTES"""
+
+
+class InvalidUploadError(ValueError):
+    """Raised when an upload is not a multipart form carrying one PDF file"""
+
+
+# Room for the multipart boundaries, part headers and small form fields around the file
+UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+class _UploadFormReceiver:
+    """
+    MultipartParser callbacks that collect the bytes of one file field and drop
+    every other part. pending holds the file bytes parsed from the latest network
+    chunk until the caller writes them out.
+    """
+
+    def __init__(self, field: str):
+        self.field = field.encode()
+        self.filename: Optional[str] = None
+        self.pending: List[bytes] = []
+        self.size = 0
+        self.done = False
+        self._in_file = False
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+
+    def callbacks(self) -> Dict[str, Any]:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, params = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._in_file = not self.done and params.get(b"name") == self.field and b"filename" in params
+        if self._in_file:
+            self.filename = params[b"filename"].decode("utf-8", "replace")
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self.pending.append(data[start:end])
+            self.size += end - start
+
+    def on_part_end(self) -> None:
+        if self._in_file:
+            self._in_file = False
+            self.done = True
 
 
 class RAGService:
     def __init__(self):
-        self.embedding_model = EmbeddingModel()
-        self.text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+        # Embedding requests are batched by token count; concurrency is tunable per deployment
+        self.embedding_model = EmbeddingModel(
+            max_batch_tokens=int(os.getenv("EMBEDDING_MAX_BATCH_TOKENS", "100000")),
+            max_concurrency=int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4")),
+        )
+        # Chunk embeddings are cached on disk so re-uploads and overlapping documents skip the API;
+        # set EMBEDDING_CACHE_PATH to an empty string to disable
+        cache_path = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db")
+        self.embedding_cache = EmbeddingCache(
+            cache_path,
+            max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000")),
+        ) if cache_path else None
+        # Query embeddings shared by every store, so repeated chat/agent queries skip the round trip
+        self.query_cache = QueryEmbeddingCache(
+            max_entries=int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024")),
+            ttl_seconds=float(os.getenv("QUERY_CACHE_TTL_SECONDS", "3600")),
+        )
+        # TEXT_SPLITTER=token sizes chunks by tokenizer count and ends them on paragraph/sentence boundaries
+        if os.getenv("TEXT_SPLITTER", "character").lower() == "token":
+            self.text_splitter = TokenTextSplitter(
+                chunk_tokens=int(os.getenv("CHUNK_TOKENS", "256")),
+                chunk_overlap=int(os.getenv("CHUNK_OVERLAP_TOKENS", "32")),
+            )
+        else:
+            self.text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+        # PDF text extraction: PDF_BACKEND is "pypdf2" or "pymupdf" (faster);
+        # PDF_EXTRACTION_WORKERS > 1 extracts page ranges of large PDFs in a shared process pool
+        self.pdf_backend = os.getenv("PDF_BACKEND", "pypdf2").lower()
+        self.pdf_workers = int(os.getenv("PDF_EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.pdf_min_parallel_pages = int(os.getenv("PDF_MIN_PARALLEL_PAGES", "32"))
+        self._pdf_executor: Optional[ProcessPoolExecutor] = None
+        # Uploads are streamed to disk as they arrive and rejected as soon as they pass
+        # PDF_UPLOAD_MAX_BYTES; PDF_UPLOAD_CHUNK_BYTES is the read size for UploadFile copies
+        self.upload_chunk_bytes = int(os.getenv("PDF_UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+        self.upload_max_bytes = int(os.getenv("PDF_UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
         self.vector_databases: Dict[str, VectorDatabase] = {}  # filename -> VectorDatabase
         self.document_metadata: Dict[str, Dict[str, Any]] = {}  # filename -> metadata
+        # Every store stacked into one matrix for cross-document search; rebuilt lazily after changes
+        self._library: Optional[LibrarySnapshot] = None
+        self._library_version = 0  # bumped by every change, so a build that raced one is not kept
+        self._library_lock = threading.Lock()
+        # Stores are persisted here and memory-mapped back in at startup;
+        # set VECTOR_STORE_DIR to an empty string to keep everything in memory only
+        self.storage_dir = os.getenv("VECTOR_STORE_DIR", "vector_stores")
+        if self.storage_dir:
+            self._restore_vector_databases()
+        
+    def _new_vector_db(self) -> VectorDatabase:
+        return VectorDatabase(
+            self.embedding_model,
+            storage="matrix",
+            embedding_cache=self.embedding_cache,
+            query_cache=self.query_cache,
+        )
+    
+    async def save_upload_stream(
+        self, chunks: AsyncIterator[bytes], content_type: str,
+        content_length: Optional[int] = None, field: str = "file"
+    ) -> Tuple[str, str, int]:
+        """
+        Parse a multipart/form-data request body as it arrives and write its file field
+        straight to a temporary file; returns (filename, path, size). Nothing is spooled
+        first, so an oversized upload is refused from its Content-Length before any of it
+        is read, or as soon as the streamed bytes pass PDF_UPLOAD_MAX_BYTES.
+        """
+        too_large = f"File exceeds the {self.upload_max_bytes} byte upload limit"
+        max_body_bytes = self.upload_max_bytes + UPLOAD_FORM_OVERHEAD_BYTES
+        if content_length is not None and content_length > max_body_bytes:
+            raise PDFTooLargeError(too_large)
         
+        media_type, params = parse_options_header(content_type)
+        if media_type != b"multipart/form-data" or not params.get(b"boundary"):
+            raise InvalidUploadError("Expected a multipart/form-data upload")
+        receiver = _UploadFormReceiver(field)
+        parser = MultipartParser(params[b"boundary"], receiver.callbacks())
+        
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+        received = 0
+        try:
+            with temp_file:
+                async for chunk in chunks:
+                    # Bounds bodies sent without Content-Length, including oversized non-file parts
+                    received += len(chunk)
+                    if received > max_body_bytes:
+                        raise PDFTooLargeError(too_large)
+                    try:
+                        parser.write(chunk)
+                    except ValueError as e:
+                        raise InvalidUploadError(f"Malformed multipart upload: {str(e)}")
+                    if receiver.filename is not None and not receiver.filename.lower().endswith(".pdf"):
+                        raise InvalidUploadError("Only PDF files are allowed")
+                    if receiver.size > self.upload_max_bytes:
+                        raise PDFTooLargeError(too_large)
+                    if receiver.pending:
+                        data = b"".join(receiver.pending)
+                        receiver.pending.clear()
+                        await asyncio.to_thread(temp_file.write, data)
+                parser.finalize()
+            if not receiver.done:
+                raise InvalidUploadError(f"No '{field}' file in upload")
+        except BaseException:
+            os.unlink(temp_file.name)
+            raise
+        return receiver.filename, temp_file.name, receiver.size
+    
+    async def save_upload(self, file: UploadFile) -> Tuple[str, int]:
+        """
+        Stream an upload to a temporary file chunk by chunk and return (path, size).
+        Only one chunk is held in memory; the loader reads the file from this path.
+        """
+        if file.size is not None and file.size > self.upload_max_bytes:
+            raise PDFTooLargeError(f"File exceeds the {self.upload_max_bytes} byte upload limit")
+        
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+        size = 0
+        try:
+            with temp_file:
+                while True:
+                    chunk = await file.read(self.upload_chunk_bytes)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.upload_max_bytes:
+                        raise PDFTooLargeError(f"File exceeds the {self.upload_max_bytes} byte upload limit")
+                    await asyncio.to_thread(temp_file.write, chunk)
+        except BaseException:
+            os.unlink(temp_file.name)
+            raise
+        return temp_file.name, size
+    
+    def _get_pdf_executor(self) -> Optional[ProcessPoolExecutor]:
+        # Started on first use and kept, so uploads do not pay process startup each time
+        if self.pdf_workers <= 1:
+            return None
+        if self._pdf_executor is None:
+            # Never fork: the server process has threads (to_thread pool, SQLite, HTTP clients)
+            # whose held locks a forked child would inherit and could deadlock on
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._pdf_executor = ProcessPoolExecutor(
+                max_workers=self.pdf_workers, mp_context=multiprocessing.get_context(start_method)
+            )
+        return self._pdf_executor
+    
+    def close(self) -> None:
+        """
+        Shut down the PDF extraction pool; called on app shutdown
+        """
+        if self._pdf_executor is not None:
+            self._pdf_executor.shutdown(wait=True, cancel_futures=True)
+            self._pdf_executor = None
+    
+    def _store_path(self, filename: str) -> str:
+        # Hash the filename so arbitrary upload names map to safe directory names
+        return os.path.join(self.storage_dir, hashlib.sha256(filename.encode("utf-8")).hexdigest())
+    
+    def _persist_vector_db(self, filename: str) -> None:
+        if not self.storage_dir:
+            return
+        vector_db = self.vector_databases[filename]
+        vector_db.metadata = self.document_metadata[filename]
+        os.makedirs(self.storage_dir, exist_ok=True)
+        vector_db.save(self._store_path(filename))
+    
+    def _restore_vector_databases(self) -> None:
+        """
+        Load persisted stores with memory-mapped matrices so startup stays fast
+        """
+        if not os.path.isdir(self.storage_dir):
+            return
+        for entry in sorted(os.listdir(self.storage_dir)):
+            path = os.path.join(self.storage_dir, entry)
+            if entry.endswith(".tmp") or not os.path.isdir(path):
+                continue
+            try:
+                vector_db = VectorDatabase.load(
+                    path,
+                    self.embedding_model,
+                    mmap=True,
+                    embedding_cache=self.embedding_cache,
+                    query_cache=self.query_cache,
+                )
+            except Exception as e:
+                print(f"Skipping unreadable vector store at {path}: {str(e)}")
+                continue
+            filename = vector_db.metadata.get("filename")
+            if not filename:
+                continue
+            self.vector_databases[filename] = vector_db
+            self.document_metadata[filename] = vector_db.metadata
+        print(f"Restored {len(self.vector_databases)} vector store(s) from {self.storage_dir}")
+    
     async def process_pdf(self, file: UploadFile) -> Dict[str, Any]:
         """
         Process uploaded PDF file and create vector database for RAG
         """
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-        
+        temp_file_path, file_size = await self.save_upload(file)
+        return await self.ingest_pdf(temp_file_path, file.filename, file_size)
+    
+    async def ingest_pdf(
+        self, file_path: str, filename: str, file_size: int, job: Optional[IngestionJob] = None
+    ) -> Dict[str, Any]:
+        """
+        Extract, split and embed a PDF saved by save_upload, then register its store.
+        The store only becomes searchable once fully built. Deletes file_path when done.
+        Progress is reported on job, if given.
+        """
         try:
             # Load PDF using aimakerspace
-            pdf_loader = PDFLoader(temp_file_path)
-            documents = pdf_loader.load_documents()
+            if job:
+                job.set_stage("extracting")
+            pdf_loader = PDFLoader(
+                file_path,
+                backend=self.pdf_backend,
+                workers=self.pdf_workers,
+                min_parallel_pages=self.pdf_min_parallel_pages,
+                executor=self._get_pdf_executor(),
+                progress_callback=job.report_pages if job else None,
+            )
+            # Extraction is CPU-bound; run it off the event loop
+            documents = await asyncio.to_thread(pdf_loader.load_documents)
             
             if not documents:
                 raise ValueError("No content could be extracted from PDF")
             
-            # Split text into chunks
-            chunks = self.text_splitter.split_texts(documents)
+            # Split text into chunk records (page and offsets into one shared text buffer)
+            if job:
+                job.set_stage("splitting")
+            chunks = await asyncio.to_thread(self.text_splitter.split_to_table, documents, pdf_loader.page_starts)
             
-            if not chunks:
+            if not len(chunks):
                 raise ValueError("No text chunks could be created from PDF")
             
-            # Create vector database and build from chunks
-            vector_db = VectorDatabase(self.embedding_model)
-            await vector_db.abuild_from_list(chunks)
+            # Create vector database and build from chunks, keyed by chunk id
+            if job:
+                job.set_stage("embedding")
+            vector_db = self._new_vector_db()
+            await vector_db.abuild_from_chunks(chunks, progress_callback=job.report_chunks if job else None)
             
             # Store vector database and metadata
-            filename = file.filename
             self.vector_databases[filename] = vector_db
+            self._invalidate_library()
             self.document_metadata[filename] = {
                 "filename": filename,
                 "chunks_count": len(chunks),
-                "total_length": sum(len(chunk) for chunk in chunks),
-                "file_size": len(content)
+                "total_length": chunks.total_length(),
+                "file_size": file_size
             }
+            await asyncio.to_thread(self._persist_vector_db, filename)
             
             return {
                 "filename": filename,
@@ -64,8 +365,8 @@ class RAGService:
             
         finally:
             # Clean up temporary file
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+            if os.path.exists(file_path):
+                os.unlink(file_path)
     
     def get_relevant_context(self, filename: str, query: str, k: int = 3) -> List[str]:
         """
@@ -75,11 +376,194 @@ class RAGService:
             return []
         
         vector_db = self.vector_databases[filename]
-        # Get search results as text-score tuples, then extract just the text
+        # Get search results as key-score tuples, then resolve the keys to chunk text
         search_results = vector_db.search_by_text(query, k=k, return_as_text=False)
-        relevant_texts = [result[0] for result in search_results] if search_results else []
+        relevant_texts = [vector_db.get_text(result[0]) for result in search_results] if search_results else []
         return relevant_texts
     
+    async def aget_relevant_context(self, filename: str, query: str, k: int = 3) -> List[str]:
+        """
+        Async variant of get_relevant_context for use inside request handlers
+        """
+        if filename not in self.vector_databases:
+            return []
+        
+        vector_db = self.vector_databases[filename]
+        return await vector_db.asearch_by_text(query, k=k, return_as_text=True)
+    
+    def get_relevant_contexts(self, filename: str, queries: List[str], k: int = 3) -> List[List[str]]:
+        """
+        Retrieve relevant context for several queries with one embedding call and one scan
+        """
+        if filename not in self.vector_databases or not queries:
+            return [[] for _ in queries]
+        
+        vector_db = self.vector_databases[filename]
+        return vector_db.search_by_texts(queries, k=k, return_as_text=True)
+    
+    def _invalidate_library(self) -> None:
+        self._library = None
+        self._library_version += 1
+    
+    def _get_library(self) -> LibrarySnapshot:
+        """
+        Stack every store's normalized matrix into one shared matrix with per-file row ranges.
+        Building copies every store, so async callers run it in a thread (_aget_library).
+        """
+        library = self._library
+        if library is not None:
+            return library
+        with self._library_lock:
+            if self._library is not None:
+                return self._library
+            version = self._library_version
+            ranges, stores, start = {}, {}, 0
+            for filename, vector_db in list(self.vector_databases.items()):
+                if len(vector_db) == 0:
+                    continue
+                ranges[filename] = (start, start + len(vector_db))
+                stores[filename] = vector_db
+                start += len(vector_db)
+            library = LibrarySnapshot(self._stack_matrices([db.matrix for db in stores.values()]), ranges, stores)
+            if version == self._library_version:
+                self._library = library
+        return library
+    
+    async def _aget_library(self) -> LibrarySnapshot:
+        library = self._library
+        return library if library is not None else await asyncio.to_thread(self._get_library)
+    
+    def _stack_matrices(self, matrices: List[np.ndarray]) -> np.ndarray:
+        """
+        Without a storage directory this is a plain vstack. With one, the stack is written to
+        a temporary .npy and memory-mapped back like the stores, so it lives in the page cache
+        rather than in resident memory; the file is unlinked at once and freed with the mapping.
+        """
+        if not matrices:
+            return np.empty((0, 0), dtype=np.float32)
+        if not self.storage_dir:
+            return np.vstack(matrices)
+        os.makedirs(self.storage_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.storage_dir, prefix="library-", suffix=".npy")
+        os.close(fd)
+        try:
+            stacked = np.lib.format.open_memmap(
+                path, mode="w+", dtype=matrices[0].dtype,
+                shape=(sum(len(matrix) for matrix in matrices), matrices[0].shape[1]),
+            )
+            start = 0
+            for matrix in matrices:
+                stacked[start:start + len(matrix)] = matrix
+                start += len(matrix)
+            stacked.flush()
+            del stacked
+            return np.load(path, mmap_mode="r")
+        finally:
+            os.unlink(path)
+    
+    def search_documents(self, query: str, k: int = 3, filenames: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Search all uploaded PDFs (or the given subset) with one scan and merge the results by score
+        """
+        library = self._get_library()
+        selected = self._select_library(library, filenames)
+        if not selected or k <= 0:
+            return []
+        
+        # Any store can embed the query; they share the model and the query cache
+        query_vector = library.stores[selected[0]].embed_queries([query])[0]
+        return self._search_library(library, query_vector, k, selected)
+    
+    async def asearch_documents(self, query: str, k: int = 3, filenames: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Async variant of search_documents; the query is embedded and the library stacked without blocking the event loop.
+        Uploads and deletes can land during that await, so the library is snapshotted only after it.
+        """
+        library = await self._aget_library()
+        selected = self._select_library(library, filenames)
+        if not selected or k <= 0:
+            return []
+        query_vector = (await library.stores[selected[0]].aembed_queries([query]))[0]
+        library = await self._aget_library()
+        return self._search_library(library, query_vector, k, self._select_library(library, filenames))
+    
+    @staticmethod
+    def _select_library(library: LibrarySnapshot, filenames: Optional[List[str]]) -> List[str]:
+        # Deduplicated, or a repeated name would count as another file and could pass for the whole library
+        return list(dict.fromkeys(
+            name for name in (filenames if filenames is not None else library.ranges)
+            if name in library.ranges
+        ))
+    
+    @staticmethod
+    def _search_library(library: LibrarySnapshot, query_vector: List[float], k: int, selected: List[str]) -> List[Dict[str, Any]]:
+        if not selected or k <= 0:
+            return []
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        query_vector = query_vector / (np.linalg.norm(query_vector) or 1.0)
+        
+        if len(selected) == len(library.ranges):
+            rows = np.arange(library.matrix.shape[0])
+            scores = library.matrix @ query_vector
+        else:
+            rows = np.concatenate([np.arange(*library.ranges[name]) for name in selected])
+            scores = library.matrix[rows] @ query_vector
+        
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        
+        # Map library rows back to their source file, chunk and page
+        names = list(library.ranges)
+        starts = np.array([library.ranges[name][0] for name in names])
+        results = []
+        for position in top:
+            row = int(rows[position])
+            filename = names[int(np.searchsorted(starts, row, side="right")) - 1]
+            chunk_index = row - library.ranges[filename][0]
+            vector_db = library.stores[filename]
+            key = vector_db.keys[chunk_index]
+            results.append({
+                "filename": filename,
+                "chunk_index": chunk_index,
+                # Stores saved before chunk records existed have no page information
+                "page": vector_db.chunks[key].page if vector_db.chunks is not None else None,
+                "text": vector_db.get_text(key),
+                "score": float(scores[position]),
+            })
+        return results
+    
+    @staticmethod
+    def _format_source(result: Dict[str, Any]) -> str:
+        location = f"page {result['page']}, chunk {result['chunk_index']}" if result["page"] else f"chunk {result['chunk_index']}"
+        return f"Source: {result['filename']} ({location})\n{result['text']}"
+    
+    def get_library_context(self, query: str, k: int = 3, filenames: Optional[List[str]] = None) -> List[str]:
+        """
+        Retrieve relevant context across documents, labelled with its source so prompts can cite it
+        """
+        return [
+            self._format_source(result)
+            for result in self.search_documents(query, k=k, filenames=filenames)
+        ]
+    
+    async def aget_library_context(self, query: str, k: int = 3, filenames: Optional[List[str]] = None) -> List[str]:
+        """
+        Async variant of get_library_context for use inside request handlers
+        """
+        return [
+            self._format_source(result)
+            for result in await self.asearch_documents(query, k=k, filenames=filenames)
+        ]
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get hit/miss statistics for the query and chunk embedding caches
+        """
+        return {
+            "query_embeddings": self.query_cache.stats(),
+            "chunk_embeddings": self.embedding_cache.stats() if self.embedding_cache is not None else None,
+        }
+    
     def get_uploaded_files(self) -> List[Dict[str, Any]]:
         """
         Get list of uploaded files and their metadata
@@ -98,6 +582,9 @@ class RAGService:
         """
         if filename in self.vector_databases:
             del self.vector_databases[filename]
+            self._invalidate_library()
+        if self.storage_dir:
+            shutil.rmtree(self._store_path(filename), ignore_errors=True)
         if filename in self.document_metadata:
             del self.document_metadata[filename]
             return True
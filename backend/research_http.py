@@ -0,0 +1,87 @@
+"""
+Shared HTTP client for the deep research tools.
+
+pubmed_search and pdf_parser used bare requests.get calls: no timeout, no
+retries, and a new DNS lookup, TCP connection and TLS handshake per call.
+They now share one requests.Session whose connection pools keep connections
+alive, so consecutive calls to a host (PubMed's esearch then efetch) reuse a
+connection. Every request gets a (connect, read) timeout unless the caller
+passes its own, and idempotent requests are retried with backoff on
+connection errors and 429/5xx responses (read timeouts are not retried).
+
+Tests can point the tools at a local stub server: set PUBMED_BASE_URL, or
+install a different session with set_session().
+"""
+import os
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RESEARCH_HTTP_CONNECT_TIMEOUT = float(os.getenv("RESEARCH_HTTP_CONNECT_TIMEOUT", "5"))
+RESEARCH_HTTP_READ_TIMEOUT = float(os.getenv("RESEARCH_HTTP_READ_TIMEOUT", "30"))
+RESEARCH_HTTP_RETRIES = int(os.getenv("RESEARCH_HTTP_RETRIES", "2"))
+# Connections kept alive per host; should cover the concurrent tool calls (RESEARCH_TOOL_WORKERS)
+RESEARCH_HTTP_POOL_SIZE = int(os.getenv("RESEARCH_HTTP_POOL_SIZE", "10"))
+PUBMED_BASE_URL = os.getenv("PUBMED_BASE_URL", "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/")
+
+USER_AGENT = "deep-research-agent/1.0"
+
+
+class TimeoutSession(requests.Session):
+    """A Session that applies a default (connect, read) timeout to every request"""
+
+    def __init__(self, timeout=(RESEARCH_HTTP_CONNECT_TIMEOUT, RESEARCH_HTTP_READ_TIMEOUT)):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def create_session(
+    retries: int = RESEARCH_HTTP_RETRIES,
+    pool_size: int = RESEARCH_HTTP_POOL_SIZE,
+    timeout=(RESEARCH_HTTP_CONNECT_TIMEOUT, RESEARCH_HTTP_READ_TIMEOUT),
+) -> requests.Session:
+    session = TimeoutSession(timeout)
+    retry = Retry(
+        total=retries,
+        # A read timeout means the server is slow, not unreachable; retrying would multiply the wait
+        read=0,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        # Hand the last response back instead of raising, so tools can report its status
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """The process-wide session, created on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
+
+
+def set_session(session: Optional[requests.Session]) -> Optional[requests.Session]:
+    """Replace the shared session (e.g. with one for a stub server); returns the previous one"""
+    global _session
+    with _session_lock:
+        previous, _session = _session, session
+    return previous
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from datetime import datetime
 from enum import Enum
 
@@ -13,6 +13,8 @@ class ChatRequest(BaseModel):
     api_key: str
     conversation_id: Optional[int] = None
     pdf_filename: Optional[str] = None  # For RAG with specific PDF
+    pdf_filenames: Optional[List[str]] = None  # For RAG across a chosen subset of PDFs
+    search_all_pdfs: bool = False  # For RAG across every uploaded PDF
     chat_mode: Optional[ChatMode] = ChatMode.general  # NEW: Chat mode selection
 
 class ChatResponse(BaseModel):
@@ -30,6 +32,23 @@ class ConversationResponse(BaseModel):
     created_at: datetime
     messages: List[MessageResponse]
 
+class ConversationSummaryResponse(BaseModel):
+    id: int
+    created_at: datetime
+    message_count: int
+    last_message_preview: Optional[str] = None
+    last_message_role: Optional[str] = None
+    last_message_at: Optional[datetime] = None
+    messages: Optional[List[MessageResponse]] = None  # Only with include_messages=true
+
+class ConversationPageResponse(BaseModel):
+    conversations: List[ConversationSummaryResponse]
+    next_cursor: Optional[int] = None  # Pass as `cursor` to get the next (older) page
+
+class MessagePageResponse(BaseModel):
+    messages: List[MessageResponse]  # Oldest first within the page
+    next_cursor: Optional[int] = None  # Pass as `before` to get older messages
+
 # PDF Management schemas
 class PDFUploadResponse(BaseModel):
     filename: str
@@ -37,12 +56,48 @@ class PDFUploadResponse(BaseModel):
     status: str
     message: str
 
+class IngestionJobResponse(BaseModel):
+    job_id: str
+    filename: str
+    status: str  # queued, extracting, splitting, embedding, completed or failed
+    pages_extracted: int
+    pages_total: Optional[int] = None
+    chunks_embedded: int
+    chunks_total: Optional[int] = None
+    error: Optional[str] = None
+    result: Optional[PDFUploadResponse] = None  # set once completed
+    created_at: float
+    finished_at: Optional[float] = None
+
 class PDFInfoResponse(BaseModel):
     filename: str
     chunks_count: int
     total_length: int
     file_size: int
 
+# Counters (hits, misses, entries) stay integers; rates and TTLs are floats
+CacheStats = Dict[str, Union[int, float]]
+
+class CacheStatsResponse(BaseModel):
+    query_embeddings: CacheStats
+    chunk_embeddings: Optional[CacheStats] = None
+    research_tools: Optional[CacheStats] = None
+
+class DBPoolStatsResponse(BaseModel):
+    pool: str
+    size: Optional[int] = None
+    checked_in: Optional[int] = None
+    checked_out: Optional[int] = None
+    overflow: Optional[int] = None
+    max_overflow: Optional[int] = None
+    checkouts: int
+    connects: int
+    invalidations: int
+    timeouts: int
+    wait_ms_avg: float
+    wait_ms_p95: float
+    wait_ms_max: float
+
 class DeletePDFRequest(BaseModel):
     filename: str
 
@@ -67,6 +122,8 @@ class ResearchStep(BaseModel):
     tool_input: str
     tool_output: str
     timestamp: str
+    # True when the tool output came from the research tool cache
+    cached: bool = False
 
 class DeepResearchResponse(BaseModel):
     final_answer: str
@@ -0,0 +1,61 @@
+"""
+Tests for background ingestion job state
+
+    cd backend
+    python -m pytest test_ingestion_jobs.py
+"""
+import asyncio
+
+from ingestion_jobs import IngestionJobManager, IngestionJobStore, InProcessBackend
+
+
+def test_job_status_is_visible_to_another_worker(tmp_path):
+    path = str(tmp_path / "ingestion_jobs.db")
+
+    async def scenario():
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def handler(job):
+            job.set_stage("embedding")
+            job.report_chunks(10, 10)
+            started.set()
+            await release.wait()
+            return {"filename": job.filename, "chunks_count": 10}
+
+        # Two managers over one job file stand in for two gunicorn workers
+        accepting = IngestionJobManager(handler, backend=InProcessBackend(workers=1), store=IngestionJobStore(path))
+        polling = IngestionJobManager(handler, backend=InProcessBackend(workers=1), store=IngestionJobStore(path))
+
+        job = await accepting.submit("report.pdf", "/tmp/report.pdf", 1024)
+        assert polling.status(job.id)["status"] == "queued"
+
+        await started.wait()
+        running = polling.status(job.id)
+        assert running["status"] == "embedding"
+        assert running["chunks_embedded"] == 10
+
+        release.set()
+        while not job.is_finished:
+            await asyncio.sleep(0.01)
+        finished = polling.status(job.id)
+        assert finished["status"] == "completed"
+        assert finished["result"]["chunks_count"] == 10
+        assert finished["finished_at"] is not None
+
+        assert polling.get(job.id) is None
+        assert polling.status("missing") is None
+        await accepting.stop()
+
+    asyncio.run(scenario())
+
+
+def test_store_keeps_only_retained_finished_jobs(tmp_path):
+    store = IngestionJobStore(str(tmp_path / "ingestion_jobs.db"), retention=2)
+    for index in range(4):
+        store.save({"job_id": f"done-{index}", "status": "completed", "finished_at": float(index)})
+    store.save({"job_id": "running", "status": "embedding", "finished_at": None})
+
+    assert store.load("done-0") is None
+    assert store.load("done-1") is None
+    assert store.load("done-3")["status"] == "completed"
+    assert store.load("running")["status"] == "embedding"
@@ -0,0 +1,83 @@
+"""
+Tests for the research tool result cache
+
+    cd backend
+    python -m pytest test_tool_cache.py
+"""
+import pytest
+from langchain_core.tools import tool
+
+import deepresearchagent
+import tool_cache
+from tool_cache import ToolResultCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ToolResultCache(str(tmp_path / "tool_cache.db"))
+    monkeypatch.setattr(tool_cache, "_cache", cache)
+    yield cache
+    cache.close()
+
+
+class FakeToolset:
+    def __init__(self, *tools):
+        self.tools_by_name = {research_tool.name: research_tool for research_tool in tools}
+
+
+def tavily_call(query: str = "HIPAA breach notification"):
+    return {"name": "tavily_search", "args": {"query": query}, "id": "call_1"}
+
+
+def test_tavily_error_result_is_not_cached(cache):
+    calls = []
+
+    @tool("tavily_search")
+    def failing_tavily(query: str) -> dict:
+        """Stands in for TavilySearch, which returns {"error": ...} instead of raising"""
+        calls.append(query)
+        return {"error": ConnectionError("401 Unauthorized: invalid API key")}
+
+    toolset = FakeToolset(failing_tavily)
+    first = deepresearchagent._run_tool_call(toolset, tavily_call(), {})
+    second = deepresearchagent._run_tool_call(toolset, tavily_call(), {})
+
+    assert "error" in first.content
+    assert not second.response_metadata.get("cached")
+    assert len(calls) == 2
+    assert len(cache) == 0
+
+
+def test_tavily_success_is_cached(cache):
+    calls = []
+
+    @tool("tavily_search")
+    def tavily(query: str) -> dict:
+        """Stands in for a successful TavilySearch call"""
+        calls.append(query)
+        return {"query": query, "results": [{"title": "Breach Notification Rule"}]}
+
+    toolset = FakeToolset(tavily)
+    deepresearchagent._run_tool_call(toolset, tavily_call(), {})
+    second = deepresearchagent._run_tool_call(toolset, tavily_call("hipaa  breach notification"), {})
+
+    assert second.response_metadata.get("cached") is True
+    assert "Breach Notification Rule" in second.content
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("result", [
+    "{'error': HTTPError('432 Client Error')}",
+    '{"error": "rate limit exceeded"}',
+    "Error searching PubMed: timed out",
+    "Error: URL does not point to a PDF file",
+])
+def test_error_results_are_not_stored(cache, result):
+    cache.put("tavily_search", {"query": "hipaa"}, result)
+    assert cache.get("tavily_search", {"query": "hipaa"}) is None
+
+
+def test_results_mentioning_error_are_stored(cache):
+    result = '{"query": "hipaa", "results": [{"content": "error rates in claims"}]}'
+    cache.put("tavily_search", {"query": "hipaa"}, result)
+    assert cache.get("tavily_search", {"query": "hipaa"}) == result
@@ -168,16 +168,23 @@ def create_linkedin_agent(openai_api_key: str, tavily_api_key: Optional[str] = N
     
     # Create PDF retrieval tool
     @tool
-    def paper_retriever(query: str) -> str:
-        """Retrieve specific information from the uploaded ML paper"""
+    def paper_retriever(query: str, related_queries: Optional[List[str]] = None) -> str:
+        """Retrieve specific information from the uploaded ML paper. Pass extra phrasings or sub-questions in related_queries to search them all in one call."""
         log_agent_execution("PaperRetriever", "searching", f"Query: {query[:50]}...", "debug")
         if not rag_service or not pdf_filename:
             return "No PDF uploaded or RAG service not available"
         try:
-            relevant_context = rag_service.get_relevant_context(pdf_filename, query, k=5)
+            queries = [query] + list(related_queries or [])
+            if len(queries) == 1:
+                relevant_context = rag_service.get_relevant_context(pdf_filename, query, k=5)
+            else:
+                # One embedding request and one scan for every query, deduplicated in rank order
+                relevant_context = []
+                for contexts in rag_service.get_relevant_contexts(pdf_filename, queries, k=5):
+                    relevant_context.extend(ctx for ctx in contexts if ctx not in relevant_context)
             if relevant_context:
                 result = f"Retrieved information from paper: {' '.join(relevant_context)}"
-                log_agent_execution("PaperRetriever", "found_context", f"Retrieved {len(relevant_context)} chunks", "debug")
+                log_agent_execution("PaperRetriever", "found_context", f"Retrieved {len(relevant_context)} chunks for {len(queries)} queries", "debug")
                 return result
             else:
                 log_agent_execution("PaperRetriever", "no_context", "No relevant information found", "debug")
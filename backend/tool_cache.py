@@ -0,0 +1,220 @@
+"""
+Result cache for the deep research tools.
+
+Research runs repeat the same wikipedia, pubmed, tavily and pdf_parser calls,
+within a run and across users researching the same regulations. Results are
+kept in a SQLite file keyed by (tool name, normalized arguments) so they
+survive restarts and are shared by the worker processes of one host.
+
+Each tool has its own time-to-live: news searches go stale in an hour, a
+parsed PDF hardly ever does. Tools without a TTL (code_interpreter,
+query_enhancer) are never cached. Once the stored results pass max_bytes the
+least recently used ones are evicted.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Seconds a result stays fresh, per tool; override as RESEARCH_TOOL_CACHE_TTLS="tavily_search=600,pdf_parser=0"
+DEFAULT_TOOL_TTLS = {
+    "tavily_search": 3600.0,
+    "wikipedia_search": 86400.0,
+    "pubmed_search": 86400.0,
+    "pdf_parser": 7 * 86400.0,
+}
+# Search queries are matched case-insensitively; URLs and code are not
+CASE_INSENSITIVE_TOOLS = {"tavily_search", "wikipedia_search", "pubmed_search"}
+# TavilySearch reports a failed request (bad key, quota, network) by returning {"error": ...}
+# instead of raising, which reaches us as the text of that dict
+ERROR_MAPPING = re.compile(r"""^\s*\{\s*['"]error['"]\s*:""")
+
+
+def parse_tool_settings(value: str) -> Dict[str, float]:
+    """Parses "tool=seconds,tool=seconds" environment settings"""
+    return {
+        name.strip(): float(seconds)
+        for name, seconds in (item.split("=", 1) for item in value.split(",") if "=" in item)
+    }
+
+
+class ToolResultCache:
+    """
+    Disk-backed cache of tool outputs keyed by (tool name, SHA-256 of the normalized arguments).
+
+    Hits refresh an entry's last-used time; entries older than their tool's TTL are
+    treated as misses and replaced on the next put.
+    """
+
+    def __init__(self, path: str = "research_tool_cache.db", max_bytes: int = 64 * 1024 * 1024,
+                 ttls: Optional[Dict[str, float]] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TOOL_TTLS if ttls is None else ttls)
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tool_results (
+                    tool TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (tool, digest)
+                )
+                """
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_tool_results_last_used ON tool_results (last_used)"
+            )
+
+    def is_cacheable(self, tool: str) -> bool:
+        return self.ttls.get(tool, 0) > 0
+
+    @staticmethod
+    def is_error_result(result: str) -> bool:
+        """
+        Failures the tools return rather than raise: "Error ..." text from pubmed_search
+        and pdf_parser, or an error mapping from TavilySearch. These depend on the caller's
+        key and the moment, so they must not be served to anyone else from the cache.
+        """
+        return result.startswith("Error") or ERROR_MAPPING.match(result) is not None
+
+    @staticmethod
+    def normalize(tool: str, args: Any) -> Any:
+        """Collapse whitespace in string arguments (and case, for search queries) so equivalent calls share an entry"""
+        if isinstance(args, dict):
+            return {key: ToolResultCache.normalize(tool, value) for key, value in args.items()}
+        if isinstance(args, list):
+            return [ToolResultCache.normalize(tool, value) for value in args]
+        if isinstance(args, str):
+            args = re.sub(r"\s+", " ", args).strip()
+            return args.casefold() if tool in CASE_INSENSITIVE_TOOLS else args
+        return args
+
+    @classmethod
+    def digest(cls, tool: str, args: Any) -> str:
+        normalized = json.dumps(cls.normalize(tool, args), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def get(self, tool: str, args: Any) -> Optional[str]:
+        if not self.is_cacheable(tool):
+            return None
+        digest = self.digest(tool, args)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT result, created_at FROM tool_results WHERE tool = ? AND digest = ?",
+                (tool, digest),
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttls[tool]:
+                self.expired += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            with self._connection:
+                self._connection.execute(
+                    "UPDATE tool_results SET last_used = ? WHERE tool = ? AND digest = ?",
+                    (now, tool, digest),
+                )
+            self.hits += 1
+        return row[0]
+
+    def put(self, tool: str, args: Any, result: str) -> None:
+        if not self.is_cacheable(tool) or self.is_error_result(result):
+            return
+        size = len(result.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            with self._connection:
+                self._connection.execute(
+                    """
+                    INSERT OR REPLACE INTO tool_results (tool, digest, result, size, created_at, last_used)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (tool, self.digest(tool, args), result, size, now, now),
+                )
+                self._evict()
+
+    def _evict(self) -> None:
+        (total,) = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM tool_results").fetchone()
+        if total <= self.max_bytes:
+            return
+        # Walk from least recently used and drop rows until the rest fits
+        overflow, doomed = total - self.max_bytes, []
+        for rowid, size in self._connection.execute("SELECT rowid, size FROM tool_results ORDER BY last_used"):
+            doomed.append((rowid,))
+            overflow -= size
+            if overflow <= 0:
+                break
+        self._connection.executemany("DELETE FROM tool_results WHERE rowid = ?", doomed)
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            (total,) = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM tool_results").fetchone()
+        return total
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute("SELECT COUNT(*) FROM tool_results").fetchone()
+        return count
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "bytes": self.total_bytes(),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            with self._connection:
+                self._connection.execute("DELETE FROM tool_results")
+            self.hits = 0
+            self.misses = 0
+            self.expired = 0
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+_cache: Optional[ToolResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_tool_cache() -> Optional[ToolResultCache]:
+    """
+    The process-wide cache, opened on first use from RESEARCH_TOOL_CACHE_PATH
+    (set it to an empty string to disable caching)
+    """
+    global _cache
+    path = os.getenv("RESEARCH_TOOL_CACHE_PATH", "research_tool_cache.db")
+    if not path:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ToolResultCache(
+                path,
+                max_bytes=int(float(os.getenv("RESEARCH_TOOL_CACHE_MAX_MB", "64")) * 1024 * 1024),
+                ttls={**DEFAULT_TOOL_TTLS, **parse_tool_settings(os.getenv("RESEARCH_TOOL_CACHE_TTLS", ""))},
+            )
+        return _cache
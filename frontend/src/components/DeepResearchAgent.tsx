@@ -11,6 +11,7 @@ interface ResearchStep {
   tool_input: string;
   tool_output: string;
   timestamp: string;
+  cached?: boolean;
 }
 
 interface DeepResearchMessage {
@@ -92,12 +93,17 @@ const DeepResearchAgent: React.FC = () => {
         content: msg.content
       }));
 
-      const response = await chatService.sendDeepResearchMessage({
-        message: content.trim(),
-        api_key: apiKey,
-        tavily_api_key: tavilyApiKey || undefined,
-        conversation_history: conversationHistory
-      });
+      // Research steps appear in the sidebar as each tool call finishes; concurrent
+      // calls can finish out of order, so keep the list sorted by step number
+      const response = await chatService.streamDeepResearchMessage(
+        {
+          message: content.trim(),
+          api_key: apiKey,
+          tavily_api_key: tavilyApiKey || undefined,
+          conversation_history: conversationHistory
+        },
+        step => setCurrentResearchSteps(prev => [...prev, step].sort((a, b) => a.step_number - b.step_number))
+      );
 
       // Update research steps
       setCurrentResearchSteps(response.research_steps);
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { chatService } from '../services/chatService';
-import { PDFInfo, PDFUploadResponse } from '../types/chat';
+import { IngestionJob, PDFInfo, PDFUploadResponse } from '../types/chat';
 
 interface PDFManagerProps {
   selectedPDF: string | null;
@@ -37,6 +37,25 @@ export const PDFManager: React.FC<PDFManagerProps> = ({ selectedPDF, onPDFSelect
     }
   };
 
+  const formatJobProgress = (job: IngestionJob): string => {
+    switch (job.status) {
+      case 'queued':
+        return '⏳ Queued for processing...';
+      case 'extracting':
+        return job.pages_total
+          ? `📖 Extracting text: page ${job.pages_extracted} of ${job.pages_total}`
+          : '📖 Extracting text...';
+      case 'splitting':
+        return '✂️ Splitting into chunks...';
+      case 'embedding':
+        return job.chunks_total
+          ? `🧠 Embedding: ${job.chunks_embedded} of ${job.chunks_total} chunks`
+          : '🧠 Embedding...';
+      default:
+        return '';
+    }
+  };
+
   const handleFileUpload = async (event: React.ChangeEvent<HTMLInputElement>) => {
     const file = event.target.files?.[0];
     if (!file) return;
@@ -50,7 +69,9 @@ export const PDFManager: React.FC<PDFManagerProps> = ({ selectedPDF, onPDFSelect
     setUploadMessage('');
 
     try {
-      const result: PDFUploadResponse = await chatService.uploadPDF(file);
+      const result: PDFUploadResponse = await chatService.uploadPDF(file, (job: IngestionJob) => {
+        setUploadMessage(formatJobProgress(job));
+      });
       setUploadMessage(`✅ ${result.message}`);
       
       // Add a small delay to ensure backend has committed the PDF
@@ -132,7 +153,7 @@ export const PDFManager: React.FC<PDFManagerProps> = ({ selectedPDF, onPDFSelect
           </div>
         )}
         {uploadMessage && (
-          <div className={`mt-1 text-xs ${uploadMessage.startsWith('✅') ? 'text-green-600' : 'text-red-600'}`}>
+          <div className={`mt-1 text-xs ${uploadMessage.startsWith('✅') ? 'text-green-600' : uploading ? 'text-gray-600' : 'text-red-600'}`}>
             {uploadMessage}
           </div>
         )}
@@ -7,6 +7,7 @@ interface ResearchStep {
   tool_input: string;
   tool_output: string;
   timestamp: string;
+  cached?: boolean;
 }
 
 interface DeepResearchMessage {
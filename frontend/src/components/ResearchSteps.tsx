@@ -6,6 +6,7 @@ interface ResearchStep {
   tool_input: string;
   tool_output: string;
   timestamp: string;
+  cached?: boolean;
 }
 
 interface ResearchStepsProps {
@@ -110,6 +111,11 @@ const ResearchSteps: React.FC<ResearchStepsProps> = ({ steps }) => {
                       <span className="text-xs bg-blue-100 text-blue-700 px-1.5 py-0.5 rounded flex-shrink-0">
                         #{step.step_number}
                       </span>
+                      {step.cached && (
+                        <span className="text-xs bg-green-100 text-green-700 px-1.5 py-0.5 rounded flex-shrink-0 ml-1">
+                          cached
+                        </span>
+                      )}
                     </div>
                     <span className="text-xs text-gray-500 flex-shrink-0 ml-2">
                       {formatTimestamp(step.timestamp)}
@@ -1,7 +1,7 @@
 import axios from 'axios';
 import { 
-  ChatRequest, ChatResponse, ConversationResponse, 
-  PDFUploadResponse, PDFInfo, DeletePDFResponse 
+  ChatRequest, ChatResponse, ConversationResponse, ConversationPage, MessagePage,
+  PDFUploadResponse, IngestionJob, PDFInfo, DeletePDFResponse 
 } from '../types/chat';
 
 interface ChatMessage {
@@ -22,6 +22,7 @@ interface ResearchStep {
   tool_input: string;
   tool_output: string;
   timestamp: string;
+  cached?: boolean;
 }
 
 interface DeepResearchResponse {
@@ -87,6 +88,12 @@ interface FileContentResponse {
 // This should be set in DigitalOcean Dashboard → Settings → Environment Variables
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000';
 
+// Shaped like an axios error so callers handle streamed and plain requests the same way
+const researchStreamError = (status: number, detail?: string) =>
+  Object.assign(new Error(detail || `Deep research failed (${status})`), {
+    response: { status, data: { detail } },
+  });
+
 class ChatService {
   private apiClient = axios.create({
     baseURL: API_BASE_URL,
@@ -105,12 +112,17 @@ class ChatService {
     }
   }
 
-  async uploadPDF(file: File): Promise<PDFUploadResponse> {
+  async uploadPDF(
+    file: File,
+    onProgress?: (job: IngestionJob) => void,
+    pollIntervalMs: number = 1000
+  ): Promise<PDFUploadResponse> {
     try {
       const formData = new FormData();
       formData.append('file', file);
       
-      const response = await this.apiClient.post<PDFUploadResponse>(
+      // The upload returns as soon as the file is saved; ingestion runs as a background job
+      const response = await this.apiClient.post<IngestionJob>(
         '/api/upload-pdf', 
         formData,
         {
@@ -119,13 +131,35 @@ class ChatService {
           },
         }
       );
-      return response.data;
+      
+      let job = response.data;
+      onProgress?.(job);
+      while (job.status !== 'completed' && job.status !== 'failed') {
+        await new Promise(resolve => setTimeout(resolve, pollIntervalMs));
+        job = await this.getIngestionJob(job.job_id);
+        onProgress?.(job);
+      }
+      
+      if (job.status === 'failed' || !job.result) {
+        throw new Error(job.error || 'PDF processing failed');
+      }
+      return job.result;
     } catch (error) {
       console.error('Error uploading PDF:', error);
       throw error;
     }
   }
 
+  async getIngestionJob(jobId: string): Promise<IngestionJob> {
+    try {
+      const response = await this.apiClient.get<IngestionJob>(`/api/ingestion-jobs/${jobId}`);
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching ingestion job:', error);
+      throw error;
+    }
+  }
+
   async getUploadedPDFs(): Promise<PDFInfo[]> {
     try {
       const response = await this.apiClient.get<PDFInfo[]>('/api/pdfs');
@@ -148,9 +182,11 @@ class ChatService {
     }
   }
 
-  async getConversations(): Promise<ConversationResponse[]> {
+  async getConversations(cursor?: number, limit: number = 20, includeMessages: boolean = false): Promise<ConversationPage> {
     try {
-      const response = await this.apiClient.get<ConversationResponse[]>('/api/conversations');
+      const response = await this.apiClient.get<ConversationPage>('/api/conversations', {
+        params: { cursor, limit, include_messages: includeMessages }
+      });
       return response.data;
     } catch (error) {
       console.error('Error getting conversations:', error);
@@ -158,6 +194,18 @@ class ChatService {
     }
   }
 
+  async getConversationMessages(conversationId: number, before?: number, limit: number = 50): Promise<MessagePage> {
+    try {
+      const response = await this.apiClient.get<MessagePage>(`/api/conversations/${conversationId}/messages`, {
+        params: { before, limit }
+      });
+      return response.data;
+    } catch (error) {
+      console.error('Error getting conversation messages:', error);
+      throw error;
+    }
+  }
+
   async createConversation(): Promise<ConversationResponse> {
     try {
       const response = await this.apiClient.post<ConversationResponse>('/api/conversations');
@@ -178,6 +226,55 @@ class ChatService {
     }
   }
 
+  async streamDeepResearchMessage(
+    request: DeepResearchRequest,
+    onStep?: (step: ResearchStep) => void
+  ): Promise<DeepResearchResponse> {
+    // EventSource cannot POST a body, so the Server-Sent Events are read from a fetch stream
+    const response = await fetch(`${API_BASE_URL}/api/deep-research/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(request),
+    });
+    if (!response.ok || !response.body) {
+      const body = await response.json().catch(() => ({}));
+      throw researchStreamError(response.status, body.detail);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    try {
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Events are separated by a blank line
+        let boundary: number;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const block = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          const event = block.match(/^event: (.*)$/m)?.[1];
+          const data = JSON.parse(block.match(/^data: (.*)$/m)?.[1] ?? 'null');
+          if (event === 'step') {
+            onStep?.(data);
+          } else if (event === 'done') {
+            return data;
+          } else if (event === 'error') {
+            throw researchStreamError(data.status_code, data.detail);
+          }
+        }
+      }
+    } catch (error) {
+      console.error('Error streaming deep research message:', error);
+      throw error;
+    } finally {
+      reader.cancel().catch(() => undefined);
+    }
+    throw new Error('Deep research stream ended without an answer');
+  }
+
   async sendLinkedInPostMessage(request: LinkedInPostRequest): Promise<LinkedInPostResponse> {
     try {
       const response = await this.apiClient.post<LinkedInPostResponse>('/api/linkedin-writer', request);
@@ -3,6 +3,8 @@ export interface ChatRequest {
   api_key: string;
   conversation_id?: number;
   pdf_filename?: string;  // For RAG with specific PDF
+  pdf_filenames?: string[];  // For RAG across a chosen subset of PDFs
+  search_all_pdfs?: boolean;  // For RAG across every uploaded PDF
   chat_mode?: 'general' | 'research_reviewer';  // NEW: Chat mode selection
 }
 
@@ -25,6 +27,26 @@ export interface ConversationResponse {
   messages: Message[];
 }
 
+export interface ConversationSummary {
+  id: number;
+  created_at: string;
+  message_count: number;
+  last_message_preview?: string;
+  last_message_role?: 'user' | 'assistant';
+  last_message_at?: string;
+  messages?: Message[];  // Only with include_messages
+}
+
+export interface ConversationPage {
+  conversations: ConversationSummary[];
+  next_cursor?: number;  // Pass as cursor to load older conversations
+}
+
+export interface MessagePage {
+  messages: Message[];  // Oldest first within the page
+  next_cursor?: number;  // Pass as before to load older messages
+}
+
 // NEW: Chat mode types
 export type ChatMode = 'general' | 'research_reviewer';
 
@@ -51,6 +73,20 @@ export interface PDFUploadResponse {
   message: string;
 }
 
+export interface IngestionJob {
+  job_id: string;
+  filename: string;
+  status: 'queued' | 'extracting' | 'splitting' | 'embedding' | 'completed' | 'failed';
+  pages_extracted: number;
+  pages_total?: number | null;
+  chunks_embedded: number;
+  chunks_total?: number | null;
+  error?: string | null;
+  result?: PDFUploadResponse | null;
+  created_at: number;
+  finished_at?: number | null;
+}
+
 export interface PDFInfo {
   filename: string;
   chunks_count: number;